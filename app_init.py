@@ -10,12 +10,5 @@ def init_app():
     font = pg.font.Font(None, 24)
     return screen, clock, font
 
-def poll_quit():
-    # pygame quirk: always pump events each frame
-    for event in pg.event.get():
-        if event.type == pg.QUIT:
-            return True
-    return False
-
 def shutdown_app():
     pg.quit()
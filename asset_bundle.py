@@ -0,0 +1,166 @@
+# asset_bundle.py
+# Precompiled atlas bundle: every atlas in texture_settings.game, already sliced into
+# frames and stored as raw BGRA pixels (the usual convert_alpha() format), behind a
+# small JSON index. At load time the file is memory-mapped and each frame is wrapped
+# with pygame.image.frombuffer, so no PNG is decoded and no pixel is copied.
+#
+# The bundle is rebuilt automatically when it is older than any source PNG or than
+# texture_settings.py. Offline use:
+#
+#   python asset_bundle.py            # rebuild if stale
+#   python asset_bundle.py --force    # always rebuild
+#   python asset_bundle.py --report   # time-to-first-frame, PNG vs bundle
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+
+import pygame as pg
+
+import texture_settings
+
+MAGIC = b"CDAB"
+VERSION = 1
+PIXEL_FORMAT = "BGRA"
+_HEADER = struct.Struct("<4sII") # magic, version, index length in bytes
+_ALIGN = 64
+
+_mapped = {} # "index", "buffer": the mapping stays alive while any frame references it
+
+def _source_paths():
+    paths = [texture_settings.texture_folder / f"{name}.png" for name in texture_settings.game]
+    return paths + [Path(texture_settings.__file__)]
+
+def bundle_is_stale(path=texture_settings.bundle_path):
+    if not path.exists():
+        return True
+    built = path.stat().st_mtime
+    return any(src.stat().st_mtime > built for src in _source_paths() if src.exists())
+
+def build_bundle(path=texture_settings.bundle_path):
+    """Slice every atlas and write the bundle. Does not need a display."""
+    index = {}
+    blobs = []
+    offset = 0
+    for name, cfg in texture_settings.game.items():
+        atlas = pg.image.load(texture_settings.texture_folder / f"{name}.png")
+        fw, fh = cfg["W"], cfg["H"]
+        aw, ah = atlas.get_size()
+        frames = [
+            pg.image.tobytes(atlas.subsurface(pg.Rect(x, y, fw, fh)), PIXEL_FORMAT)
+            for y in range(0, ah - fh + 1, fh)
+            for x in range(0, aw - fw + 1, fw)
+        ]
+        index[name] = {"W": fw, "H": fh, "length": len(frames), "offset": offset}
+        for frame in frames:
+            blobs.append(frame)
+            offset += len(frame)
+
+    index_bytes = json.dumps(index).encode()
+    data_start = -(-(_HEADER.size + len(index_bytes)) // _ALIGN) * _ALIGN
+    index_bytes = index_bytes.ljust(data_start - _HEADER.size)
+
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp, path) # never leave a half-written bundle behind
+    _mapped.clear()
+
+def ensure_bundle(path=texture_settings.bundle_path):
+    if bundle_is_stale(path):
+        build_bundle(path)
+
+def _open_bundle(path):
+    if "index" not in _mapped:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_len = _HEADER.unpack_from(mm)
+        if magic != MAGIC or version != VERSION:
+            mm.close()
+            raise ValueError(f"asset_bundle: {path} is not a version {VERSION} bundle")
+        data_start = _HEADER.size + index_len
+        _mapped["index"] = json.loads(bytes(mm[_HEADER.size:data_start]))
+        _mapped["buffer"] = memoryview(mm)[data_start:]
+    return _mapped["index"], _mapped["buffer"]
+
+def load_bundled_atlas(name, path=texture_settings.bundle_path):
+    """Same shape as atlas.load_game_atlas, but frames are views into the mapped bundle."""
+    index, buffer = _open_bundle(path)
+    entry = index[name]
+    w, h = entry["W"], entry["H"]
+    size = w * h * 4
+    frames = [
+        pg.image.frombuffer(buffer[entry["offset"] + i * size:entry["offset"] + (i + 1) * size], (w, h), PIXEL_FORMAT)
+        for i in range(entry["length"])
+    ]
+    return {"frames": frames, "length": len(frames), "alpha_frames": {}}
+
+# ------------------ startup timing report ------------------
+
+def _time_first_frame(use_bundle):
+    import settings as S
+    import assets
+    from app_init import init_app
+    from commands import process_commands
+    from initalisation import init_game
+    from render import render
+
+    S.USE_ASSET_BUNDLE = use_bundle
+    assets.release_assets()
+    _mapped.clear()
+
+    t0 = time.perf_counter()
+    screen, clock, font = init_app()
+    reg, state = init_game()
+    state["game_state"] = "active"
+    process_commands(reg, state)
+    render(screen, reg, state, font)
+    pg.display.flip()
+    first_frame = time.perf_counter() - t0
+
+    # everything render may still load later: masks on first use, screen_death on death
+    t0 = time.perf_counter()
+    for name in texture_settings.game:
+        assets.get_atlas(name)
+    all_atlases = time.perf_counter() - t0
+
+    return first_frame, all_atlases
+
+def startup_report():
+    from app_init import init_app, shutdown_app
+
+    ensure_bundle()
+    init_app() # pay SDL's one-off initialisation outside the measurements
+    _time_first_frame(False) # ... and module imports
+    print(f"{'source':>8} {'first frame ms':>15} {'all atlases ms':>15} {'total ms':>10}")
+    for label, use_bundle in (("png", False), ("bundle", True)):
+        first_frame, all_atlases = _time_first_frame(use_bundle)
+        print(
+            f"{label:>8} {first_frame * 1000:>15.2f} {all_atlases * 1000:>15.2f} "
+            f"{(first_frame + all_atlases) * 1000:>10.2f}"
+        )
+    shutdown_app()
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precompiled atlas bundle")
+    parser.add_argument("--force", action="store_true", help="rebuild even if up to date")
+    parser.add_argument("--report", action="store_true", help="print startup timings, PNG vs bundle")
+    args = parser.parse_args()
+
+    if args.force:
+        build_bundle()
+    else:
+        ensure_bundle()
+    if args.report:
+        startup_report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# assets.py
+# Process-wide asset cache. Atlases are decoded on first use (screen_death only when
+# the player first dies) and the same surfaces are handed to every game state, so a
+# restart loads nothing from disk. The full-screen trail layer is reused the same way.
+# With USE_ASSET_BUNDLE, atlases come from the precompiled bundle (rebuilt first if stale),
+# falling back to the PNGs if the bundle cannot be built or read.
+
+import pygame as pg
+
+import settings as S
+import texture_settings
+from asset_bundle import ensure_bundle, load_bundled_atlas
+from atlas import load_game_atlas
+from trails import make_trail_layer
+
+_atlases = {}  # name -> {"frames", "length", "alpha_frames"}
+_surfaces = {} # name -> reusable screen-sized layers
+_bundle = {}   # "ok": whether the bundle is usable, checked once per process
+
+def _load_atlas(name):
+    if S.USE_ASSET_BUNDLE:
+        if "ok" not in _bundle:
+            try:
+                ensure_bundle()
+                _bundle["ok"] = True
+            except OSError:
+                _bundle["ok"] = False
+        if _bundle["ok"]:
+            try:
+                return load_bundled_atlas(name)
+            except (OSError, ValueError, KeyError):
+                _bundle["ok"] = False
+    return load_game_atlas(name, texture_settings.game[name], texture_settings.texture_folder)
+
+def get_atlas(name):
+    atlas = _atlases.get(name)
+    if atlas is None:
+        atlas = _load_atlas(name)
+        _atlases[name] = atlas
+    return atlas
+
+def fresh_trail_layer():
+    """The shared trail layer, cleared for a new game by the next render."""
+    layer = _surfaces.get("trail")
+    if layer is None:
+        layer = make_trail_layer()
+        _surfaces["trail"] = layer
+    else:
+        layer["stale"] = True # games may start on the sim thread; pixels belong to render
+    return layer
+
+def render_target(size):
+    """Reusable offscreen surface for world layers drawn below window resolution."""
+    key = ("world", size)
+    target = _surfaces.get(key)
+    if target is None:
+        target = pg.Surface(size).convert()
+        _surfaces[key] = target
+    return target
+
+def release_assets():
+    """Drop every cached asset, e.g. after the display mode changes."""
+    _atlases.clear()
+    _surfaces.clear()
+    _bundle.clear()
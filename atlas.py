@@ -5,9 +5,10 @@ from pathlib import Path
 def load_game_atlas(name, cfg, folder):
     """
     Load folder + name + ".png" and cut into tiles of size (cfg["W"], cfg["H"]).
+    Tiles are subsurfaces: they share the atlas pixels, nothing is copied.
 
     Returns:
-        {"frames": [Surface, ...], "length": int}
+        {"frames": [Surface, ...], "length": int, "alpha_frames": {}}
     """
     
     atlas_path = folder / f"{name}.png"
@@ -16,19 +17,54 @@ def load_game_atlas(name, cfg, folder):
     fw, fh = cfg["W"], cfg["H"]
     aw, ah = atlas.get_size()
 
-    frames = []
-    for y in range(0, ah, fh):
-        for x in range(0, aw, fw):
-            frame = pg.Surface((fw, fh), pg.SRCALPHA)
-            frame.blit(atlas, (0, 0), pg.Rect(x, y, fw, fh))
-            frames.append(frame)
+    frames = [
+        atlas.subsurface(pg.Rect(x, y, fw, fh))
+        for y in range(0, ah - fh + 1, fh)
+        for x in range(0, aw - fw + 1, fw)
+    ]
 
-    return {"frames": frames, "length": len(frames)}
+    return {
+        "frames": frames,
+        "length": len(frames),
+        "alpha_frames": {}, # (frame idx, alpha[, scale]) -> Surface, filled by get_alpha_frame
+    }
 
 def get_frame(frames, idx):
     idx %= len(frames)
     return frames[idx]
 
+def get_alpha_frame(atlas, idx, alpha=255) -> pg.Surface:
+    """
+    Cached get_frame_with_alpha: each (frame, alpha) is baked once per atlas,
+    later calls allocate nothing. Do not modify the returned surface.
+    """
+    idx %= atlas["length"]
+    if alpha >= 255:
+        return atlas["frames"][idx]
+
+    key = (idx, alpha)
+    frame = atlas["alpha_frames"].get(key)
+    if frame is None:
+        frame = get_frame_with_alpha(atlas["frames"], idx, alpha)
+        atlas["alpha_frames"][key] = frame
+    return frame
+
+def get_scaled_frame(atlas, idx, alpha=255, scale=1.0) -> pg.Surface:
+    """get_alpha_frame, resampled by scale for a lower-resolution render target. Cached."""
+    if scale == 1.0:
+        return get_alpha_frame(atlas, idx, alpha)
+    idx %= atlas["length"]
+    key = (idx, alpha, scale)
+    frame = atlas["alpha_frames"].get(key)
+    if frame is None:
+        src = atlas["frames"][idx]
+        w, h = src.get_size()
+        frame = pg.transform.smoothscale(src, (max(1, round(w * scale)), max(1, round(h * scale))))
+        if alpha < 255:
+            frame.set_alpha(alpha)
+        atlas["alpha_frames"][key] = frame
+    return frame
+
 def get_frame_with_alpha(frames, idx, alpha=255) -> pg.Surface:
     """
     Get frames[idx] (wrapped), copy it, apply uniform alpha, return it.
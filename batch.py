@@ -0,0 +1,208 @@
+# batch.py
+# Headless batch runner for balance sweeps. Every combination of the swept settings is
+# played for a number of seeds, each game driven by a scripted dodge policy, across a
+# process pool. Results are aggregated per combination into one table.
+#
+# Settings are injected per run: a run carries its own overrides and applies them with
+# headless.override_settings() for exactly its duration, so runs sharing a worker do not leak
+# values into each other. Dotted names reach into dict settings.
+#
+#   python batch.py --param BULLET_SPAWN_AT_HIT=1,2,3 --param MASKS.1.cost=5,10 \
+#                   --seeds 500 --seconds 120 --csv sweep.csv
+
+import argparse
+import ast
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import headless
+import keymap as K
+import settings as S
+from ecs import is_alive, slot_of, tag_mask, view
+from game import step_game
+from headless import override_settings
+from initalisation import init_game
+from input_state import TRACKED_KEYS, get_keys, pack_keys, set_keys
+from state_handling import state_key_processing
+
+# applied under every run's own overrides: batch games need no rewind history
+BASE_OVERRIDES = {"REWIND_ENABLED": False}
+
+# dodge policy tuning; a perfect dodger never gets hit, so the game would never escalate
+POLICY_REACTION_STEPS = 12 # decisions are made this often and held in between
+POLICY_SKILL = 0.6      # share of decisions that dodge; the rest pick a random direction
+POLICY_LOOKAHEAD = 0.25 # s; bullets are avoided where they will be, not where they are
+POLICY_RADIUS = 120.0   # px; bullets further away are ignored
+POLICY_WALL_WEIGHT = 0.5
+POLICY_DEADZONE = 0.002 # push below this does not move the player
+POLICY_MASK_RADIUS = 40.0 # px; put on the first affordable mask when a bullet gets this close
+
+_clock = time.perf_counter
+
+# ------------------ scripted player ------------------
+
+def dodge_policy(reg, state, rng):
+    """Key mask steering the player away from nearby bullets and from the walls."""
+    if state["frame"] % POLICY_REACTION_STEPS:
+        return pack_keys(get_keys())
+    keys = dict.fromkeys(TRACKED_KEYS, False)
+    p = state["player_eid"]
+    if not is_alive(reg, p):
+        return 0
+    if rng.random() >= POLICY_SKILL:
+        for key in (K.UP, K.DOWN, K.LEFT, K.RIGHT):
+            keys[key] = rng.random() < 0.5
+        return pack_keys(keys)
+    ppos = reg["column"]["position"][slot_of(reg, p)].astype(np.float64)
+
+    bullets = tag_mask(reg, "bullet")
+    ahead = view(reg, "position")[bullets] + view(reg, "velocity")[bullets] * POLICY_LOOKAHEAD
+    d = ahead - ppos
+    dist2 = (d * d).sum(axis=1)
+    near = dist2 < POLICY_RADIUS * POLICY_RADIUS
+    push = -(d[near] / np.maximum(dist2[near], 1.0)[:, None]).sum(axis=0)
+
+    # walls push back like a bullet sitting just outside the screen
+    x, y = ppos
+    push[0] += POLICY_WALL_WEIGHT * (1.0 / max(x, 1.0) - 1.0 / max(S.SCREEN_W - x, 1.0))
+    push[1] += POLICY_WALL_WEIGHT * (1.0 / max(y, 1.0) - 1.0 / max(S.SCREEN_H - y, 1.0))
+
+    keys[K.RIGHT] = push[0] > POLICY_DEADZONE
+    keys[K.LEFT] = push[0] < -POLICY_DEADZONE
+    keys[K.DOWN] = push[1] > POLICY_DEADZONE
+    keys[K.UP] = push[1] < -POLICY_DEADZONE
+
+    if near.any() and dist2[near].min() < POLICY_MASK_RADIUS * POLICY_MASK_RADIUS:
+        for key, mask in K.KEY_TO_MASK.items():
+            if not state["mask_engagement"][mask] and state["mana"] >= S.MASKS[mask]["cost"]:
+                keys[key] = True
+                break
+    return pack_keys(keys)
+
+# ------------------ runs ------------------
+
+def run_game(seed, max_seconds, policy=dodge_policy):
+    """Play one game until death or max_seconds of game time, with the current settings."""
+    reg, state = init_game(seed)
+    policy_rng = random.Random(seed) # the policy's own stream; the game's rng stays untouched
+    state["game_state"] = "active"
+    dt = 1.0 / S.SIM_HZ
+    peak = 0
+    masks = 0
+    tick = 0.0
+    for _ in range(int(max_seconds * S.SIM_HZ)):
+        set_keys(policy(reg, state, policy_rng))
+        state_key_processing(reg, state)
+        if state["game_state"] == "death":
+            break
+        mana = state["mana"]
+        t0 = _clock()
+        step_game(reg, state, dt)
+        tick += _clock() - t0
+        masks += state["mana"] < mana # mana only ever drops by buying a mask
+        peak = max(peak, len(reg["tag"]["bullet"]))
+
+    steps = max(state["frame"], 1)
+    return {
+        "survival_s": state["frame"] / S.SIM_HZ,
+        "died": state["game_state"] == "death",
+        "hits": state["hits"],
+        "masks": masks,
+        "peak_bullets": peak,
+        "tick_ms": tick / steps * 1000.0,
+    }
+
+def _run_task(task):
+    combo, overrides, seed, max_seconds = task
+    with override_settings({**BASE_OVERRIDES, **overrides}):
+        result = run_game(seed, max_seconds)
+    result["combo"] = combo
+    return result
+
+def sweep(params, seeds, max_seconds, workers=None, base_seed=0):
+    """
+    params: {setting name: [values]}. Every combination is played with the same seeds,
+    so differences between rows come from the settings rather than from luck.
+    Returns one aggregated row per combination.
+    """
+    names = list(params)
+    combos = [dict(zip(names, values)) for values in itertools.product(*params.values())]
+    tasks = [
+        (i, overrides, base_seed + s, max_seconds)
+        for i, overrides in enumerate(combos)
+        for s in range(seeds)
+    ]
+
+    workers = workers or os.cpu_count()
+    chunk = max(1, len(tasks) // (workers * 8))
+    with ProcessPoolExecutor(workers, initializer=headless.init_headless) as pool:
+        results = list(pool.map(_run_task, tasks, chunksize=chunk))
+
+    rows = []
+    for i, overrides in enumerate(combos):
+        runs = [r for r in results if r["combo"] == i]
+        survival = np.array([r["survival_s"] for r in runs])
+        rows.append({
+            **overrides,
+            "runs": len(runs),
+            "died_pct": 100.0 * np.mean([r["died"] for r in runs]),
+            "survival_mean_s": survival.mean(),
+            "survival_p10_s": np.percentile(survival, 10),
+            "hits_mean": np.mean([r["hits"] for r in runs]),
+            "masks_mean": np.mean([r["masks"] for r in runs]),
+            "peak_bullets_mean": np.mean([r["peak_bullets"] for r in runs]),
+            "peak_bullets_max": max(r["peak_bullets"] for r in runs),
+            "tick_ms_mean": np.mean([r["tick_ms"] for r in runs]),
+        })
+    return rows
+
+# ------------------ output ------------------
+
+def print_table(rows):
+    if not rows:
+        return
+    columns = list(rows[0])
+    cells = [[f"{v:.2f}" if isinstance(v, float) else str(v) for v in row.values()] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.rjust(w) for c, w in zip(columns, widths)))
+    for r in cells:
+        print("  ".join(v.rjust(w) for v, w in zip(r, widths)))
+
+def write_csv(path, rows):
+    with open(path, "w") as f:
+        f.write(",".join(rows[0]) + "\n")
+        for row in rows:
+            f.write(",".join(f"{v:.4f}" if isinstance(v, float) else str(v) for v in row.values()) + "\n")
+
+def _parse_param(text):
+    name, _, values = text.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"expected NAME=v1,v2,..., got {text!r}")
+    return name, [ast.literal_eval(v) for v in values.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel balance sweep over seeded headless games")
+    parser.add_argument("--param", type=_parse_param, action="append", default=[], metavar="NAME=V1,V2",
+                        help="setting to sweep; repeat for a grid. Dotted names reach into dicts")
+    parser.add_argument("--seeds", type=int, default=100, help="games per combination")
+    parser.add_argument("--seconds", type=float, default=120.0, help="game time cap per run")
+    parser.add_argument("--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--csv", metavar="FILE", help="also write the table to FILE")
+    args = parser.parse_args()
+
+    t0 = _clock()
+    rows = sweep(dict(args.param), args.seeds, args.seconds, args.workers, args.seed)
+    print_table(rows)
+    print(f"{sum(r['runs'] for r in rows)} games in {_clock() - t0:.1f} s")
+    if args.csv:
+        write_csv(args.csv, rows)
+
+
+if __name__ == "__main__":
+    main()
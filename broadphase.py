@@ -0,0 +1,108 @@
+# broadphase.py
+# Uniform-grid broadphase over the dense ECS columns.
+# The grid is a sorted index rather than a dict of lists: indexed slots are ordered by
+# cell key, and the entities of a cell form one contiguous run found with searchsorted.
+# Keys fit in 16 bits up to 65536 cells, so the per-tick rebuild is a stable radix sort:
+# O(n); larger grids (big windows, small cells) fall back to 32-bit keys and a merge sort.
+
+import numpy as np
+
+import settings as S
+from ecs import view
+
+# half neighbourhood: every pair of adjacent cells is visited exactly once
+_PAIR_OFFSETS = ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+def make_grid(cell_size=None):
+    cell_size = cell_size or S.BROADPHASE_CELL
+    cols = int(np.ceil(S.SCREEN_W / cell_size))
+    rows = int(np.ceil(S.SCREEN_H / cell_size))
+    key_dtype = np.uint16 if cols * rows <= 2**16 else np.uint32
+    return {
+        "cell": float(cell_size),
+        "cols": cols,
+        "rows": rows,
+        "key_dtype": key_dtype,
+        "slots": np.zeros(0, dtype=np.intp),    # indexed slots, sorted by cell key
+        "keys":  np.zeros(0, dtype=key_dtype),  # cell key of each entry in "slots"
+        "max_radius": 0.0,
+    }
+
+def _cell_coords(grid, xy):
+    c = np.floor_divide(xy, grid["cell"]).astype(np.intp)
+    np.clip(c[..., 0], 0, grid["cols"] - 1, out=c[..., 0])
+    np.clip(c[..., 1], 0, grid["rows"] - 1, out=c[..., 1])
+    return c
+
+def rebuild_grid(grid, reg, mask=None):
+    """Index the live slots selected by mask (all live slots if None)."""
+    slots = np.arange(reg["count"]) if mask is None else np.flatnonzero(mask)
+    c = _cell_coords(grid, view(reg, "position")[slots])
+    keys = (c[:, 1] * grid["cols"] + c[:, 0]).astype(grid["key_dtype"])
+
+    order = np.argsort(keys, kind="stable")
+    grid["slots"] = slots[order]
+    grid["keys"] = keys[order]
+    grid["max_radius"] = float(view(reg, "size")[slots].max()) if len(slots) else 0.0
+
+def query_circle(grid, reg, center, radius):
+    """Entity ids of indexed entities whose circle overlaps (center, radius)."""
+    if not len(grid["slots"]):
+        return np.zeros(0, dtype=np.int32)
+
+    reach = radius + grid["max_radius"]
+    (x0, y0), (x1, y1) = _cell_coords(grid, np.array(
+        ((center[0] - reach, center[1] - reach), (center[0] + reach, center[1] + reach))))
+
+    # cells of one grid row are consecutive keys: one run per row
+    rows = np.arange(y0, y1 + 1) * grid["cols"]
+    lo = np.searchsorted(grid["keys"], rows + x0, "left")
+    hi = np.searchsorted(grid["keys"], rows + x1, "right")
+    cand = np.concatenate([grid["slots"][a:b] for a, b in zip(lo.tolist(), hi.tolist())])
+
+    d = view(reg, "position")[cand] - np.asarray(center, dtype=np.float32)
+    rr = view(reg, "size")[cand] + radius
+    hit = np.einsum("ij,ij->i", d, d) <= rr * rr
+    return reg["dense"][cand[hit]]
+
+def overlapping_pairs(grid, reg):
+    """(k, 2) array of entity id pairs among indexed entities whose circles overlap."""
+    keys = grid["keys"].astype(np.intp)
+    n = len(keys)
+    if n < 2:
+        return np.zeros((0, 2), dtype=np.int32)
+
+    cols, rows = grid["cols"], grid["rows"]
+    cx, cy = keys % cols, keys // cols
+    index = np.arange(n)
+
+    first, second = [], []
+    for dx, dy in _PAIR_OFFSETS:
+        nx, ny = cx + dx, cy + dy
+        valid = (nx >= 0) & (nx < cols) & (ny < rows)
+        nkeys = ny * cols + nx
+        if dx == 0 and dy == 0:
+            lo = index + 1 # same cell: only later entries, so each pair appears once
+        else:
+            lo = np.searchsorted(keys, nkeys, "left")
+        hi = np.searchsorted(keys, nkeys, "right")
+        counts = np.where(valid, np.maximum(hi - lo, 0), 0)
+
+        total = int(counts.sum())
+        if not total:
+            continue
+        i = np.repeat(index, counts)
+        run_start = np.repeat(np.cumsum(counts) - counts, counts)
+        first.append(i)
+        second.append(lo[i] + np.arange(total) - run_start)
+
+    if not first:
+        return np.zeros((0, 2), dtype=np.int32)
+
+    a = grid["slots"][np.concatenate(first)]
+    b = grid["slots"][np.concatenate(second)]
+    pos, size = view(reg, "position"), view(reg, "size")
+    d = pos[a] - pos[b]
+    rr = size[a] + size[b]
+    hit = np.einsum("ij,ij->i", d, d) <= rr * rr
+    return np.stack((reg["dense"][a[hit]], reg["dense"][b[hit]]), axis=1)
@@ -1,13 +1,21 @@
 # commands.py
 
-import random
-
 import pygame as pg
 
 import settings as S
 import texture_settings
-from ecs import create_entity, destroy_entity
-from helpers import aim_at, entity_exists, random_edge_position
+from ecs import (
+    add_tag,
+    add_tag_many,
+    compact_registry,
+    create_entities,
+    create_entity,
+    destroy_entities,
+    find,
+    set_component,
+    slot_of,
+)
+from helpers import aim_at_many, random_edge_positions
 
 
 def make_command_buffer():
@@ -26,9 +34,10 @@ def cmd_spawn_player():
         "type": "spawn_player",
     }
 
-def cmd_spawn_bullet():
+def cmd_spawn_bullet(n=1):
     return {
         "type": "spawn_bullet",
+        "n": n,
     }
 
 def cmd_spawn_masks():
@@ -39,26 +48,36 @@ def cmd_spawn_masks():
 
 def player_spawning(reg, state):
     e = create_entity(reg)
-    reg["tag"]["player"].add(e)
-    reg["component"]["position"][e] = pg.Vector2((S.SCREEN_W * 0.5, S.SCREEN_H * 0.5))
-    reg["component"]["velocity"][e]  = pg.Vector2(0, 0)
-    reg["component"]["size"][e]  = float(S.PLAYER_RADIUS)
-    reg["component"]["colour"][e]    = random.randint(0, state["pallete_size"]-1)
-    reg["component"]["shape"][e]     = S.SHAPE_PLAYER
+    add_tag(reg, e, "player")
+    s = slot_of(reg, e)
+    col = reg["column"]
+    col["position"][s] = (S.SCREEN_W * 0.5, S.SCREEN_H * 0.5)
+    col["velocity"][s] = (0, 0)
+    col["size"][s]     = S.PLAYER_RADIUS
+    col["colour"][s]   = state["rng"].randint(0, state["pallete_size"]-1)
+    reg["component"]["shape"][e] = S.SHAPE_PLAYER
 
     state["player_eid"] = e
 
-def bullet_spawning(reg, state):
-    position = random_edge_position(S.BULLET_RADIUS)
-    velocity = aim_at(position, reg["component"]["position"][state["player_eid"]])*random.uniform(S.BULLET_SPEED_MIN, S.BULLET_SPEED_MAX)
-
-    e = create_entity(reg)
-    reg["tag"]["bullet"].add(e)
-    reg["component"]["position"][e] = position
-    reg["component"]["velocity"][e]  = velocity
-    reg["component"]["size"][e]  = float(S.BULLET_RADIUS)
-    reg["component"]["colour"][e]    = random.randint(0, state["pallete_size"]-1)
-    reg["component"]["shape"][e]     = S.SHAPE_BULLET
+def bullets_spawning(reg, state, n):
+    """Spawn n bullets at once: edge positions, aim and speed are drawn as arrays."""
+    if n <= 0:
+        return
+    rng = state["np_rng"]
+    col = reg["column"]
+    target = col["position"][slot_of(reg, state["player_eid"])].copy()
+
+    positions = random_edge_positions(n, S.BULLET_RADIUS, rng)
+    velocities = aim_at_many(positions, target, rng) * rng.uniform(S.BULLET_SPEED_MIN, S.BULLET_SPEED_MAX, (n, 1))
+
+    es = create_entities(reg, n)
+    s = slice(reg["count"] - n, reg["count"])
+    col["position"][s] = positions
+    col["velocity"][s] = velocities
+    col["size"][s]     = S.BULLET_RADIUS
+    col["colour"][s]   = rng.integers(0, state["pallete_size"], n)
+    add_tag_many(reg, es, "bullet")
+    reg["component"]["shape"].update(dict.fromkeys(es.tolist(), S.SHAPE_BULLET))
 
 """
 def trail_spawning(reg, state, parent_e):
@@ -73,11 +92,11 @@ def trail_spawning(reg, state, parent_e):
 
 def mask_spawning(reg, state, mask_type):
     e = create_entity(reg)
-    reg["tag"]["mask"].add(e)
-    reg["component"]["position"][e] = reg["component"]["position"][state["player_eid"]]
-    reg["component"]["mask_type"][e] = mask_type
-    reg["component"]["phase"][e] = "active"
-    reg["component"]["phase_end"][e] = state["frame"] + int(S.MASKS[mask_type]["active_phase_duration"]*S.TARGET_FPS)
+    add_tag(reg, e, "mask")
+    reg["column"]["position"][slot_of(reg, e)] = reg["column"]["position"][slot_of(reg, state["player_eid"])]
+    set_component(reg, "mask_type", e, mask_type)
+    set_component(reg, "phase", e, "active")
+    reg["component"]["phase_end"][e] = state["frame"] + int(S.MASKS[mask_type]["active_phase_duration"]*S.SIM_HZ)
     reg["component"]["texture_name"][e] = "mask_" + S.MASKS[mask_type]["name"]
     reg["component"]["current_texture"][e] = 0
     reg["component"]["offset"][e] =  pg.math.Vector2(
@@ -88,38 +107,55 @@ def mask_spawning(reg, state, mask_type):
                             texture_settings.game[reg["component"]["texture_name"][e]]["H"]) / 2
 def masks_spawning(reg, state):
     for mask in state["mask_engagement"]:
-        if state["mask_engagement"][mask] and not entity_exists(reg, state, "mask_type", mask):
+        if state["mask_engagement"][mask] and not find(reg, "mask_type", mask):
             mask_spawning(reg, state, mask)
 
 
 def cmd_destroy(e):
     return {"type": "destroy", "e": int(e)}
 
+# --- batched application: one handler call per command type per frame ---
+
+def _apply_spawn_player(reg, state, cmds):
+    for _ in cmds:
+        player_spawning(reg, state)
+
+def _apply_spawn_bullet(reg, state, cmds):
+    bullets_spawning(reg, state, sum(c.get("n", 1) for c in cmds))
+
+def _apply_spawn_mask(reg, state, cmds):
+    masks_spawning(reg, state) # idempotent: spawns every engaged mask that is missing
+
+def _apply_destroy(reg, state, cmds):
+    destroy_entities(reg, [c["e"] for c in cmds])
+
+COMMAND_HANDLERS = {
+    "spawn_player": _apply_spawn_player,
+    "spawn_bullet": _apply_spawn_bullet,
+    "spawn_mask":   _apply_spawn_mask,
+    "destroy":      _apply_destroy,
+}
+
 def process_commands(reg, state):
     """
     Apply and clear pending commands.
+    Commands are grouped by type and each group is applied in one bulk operation;
+    groups run in the order their type was first enqueued (player before its bullets).
     """
+    if state["frame"] % S.ECS_COMPACT_INTERVAL == 0:
+        compact_registry(reg)
+
     cmd_buf = state["commands"]
     if not cmd_buf:
         return
 
+    batches = {}
     for c in cmd_buf:
-        t = c.get("type")
-
-        if t == "spawn_player":
-            player_spawning(reg, state)
-
-        elif t == "spawn_bullet":
-            bullet_spawning(reg, state)
-
-        elif t == "spawn_mask":
-            masks_spawning(reg, state)
-
-        elif t == "destroy":
-            destroy_entity(reg, c["e"])
+        batches.setdefault(c.get("type"), []).append(c)
 
-        else:
-            # unknown command: ignore (or raise if you prefer)
-            pass
+    for t, cmds in batches.items():
+        handler = COMMAND_HANDLERS.get(t)
+        if handler is not None: # unknown command: ignore
+            handler(reg, state, cmds)
 
     cmd_buf.clear()
@@ -1,48 +1,313 @@
 # ecs.py
-# Minimal ECS registry: entity ids are ints; components are dicts; tags are sets.
+# Minimal ECS registry: entity ids are ints; tags are sets.
+# An entity id is a handle: (generation << INDEX_BITS) | index. Indices are recycled
+# through a free list, and the generation is bumped on destroy, so a stale handle
+# (e.g. held by a queued cmd_destroy) is detected instead of hitting a new entity.
+# Hot components (position, velocity, size, colour) live in dense NumPy columns
+# (struct-of-arrays) addressed through a sparse set: sparse[index] -> slot, dense[slot] -> e.
+# Live entities always occupy slots [0, count), so systems can work on whole columns.
+# Cold components are plain dicts keyed by entity id; low-cardinality ones (INDEXED)
+# also keep a value index, written through set_component.
+# Tag queries are cached per structural version: any create/destroy/tag/compaction
+# bumps reg["version"], and each query is rebuilt at most once per version.
 
-def make_registry():
+import heapq
+
+import numpy as np
+
+INITIAL_CAPACITY = 64
+
+INDEX_BITS = 20
+INDEX_MASK = (1 << INDEX_BITS) - 1
+
+# name -> (dtype, per-entity shape)
+COLUMNS = {
+    "position": (np.float32, (2,)),
+    "velocity": (np.float32, (2,)),
+    "size":     (np.float32, ()),
+    "colour":   (np.int32,   ()),
+    "tags":     (np.uint8,   ()), # bit set of TAG_BITS, mirrors reg["tag"]
+}
+
+INDEXED = ("mask_type", "phase") # cold components with a value -> entities index
+_EMPTY = frozenset()
+
+TAG_BITS = {
+    "player": 1,
+    "bullet": 2,
+    "trail":  4,
+    "mask":   8,
+}
+
+def make_registry(capacity=INITIAL_CAPACITY):
     return {
-        "next_entity": 1,
-        
-        "component": { # e-> data
-            "position":        {}, # e -> pygame.Vector2,
-            "velocity":        {}, # e -> pygame.Vector2
-            
+        "next_entity": 1, # next never-used index
+        "free": [],       # min-heap of recycled indices, so live indices stay low
+        "count": 0,       # live entities, packed into slots [0, count)
+        "version": 0,     # bumped on every structural change; invalidates "views"
+        "views": {},      # query key -> (version, cached mask)
+
+        "sparse":     np.full(capacity, -1, dtype=np.int32), # index -> slot, -1 if dead
+        "generation": np.zeros(capacity, dtype=np.uint32),   # index -> current generation
+        "dense":      np.zeros(capacity, dtype=np.int64),    # slot -> e (full handle)
+
+        "column": { # slot -> data
+            name: np.zeros((capacity, *shape), dtype=dtype)
+            for name, (dtype, shape) in COLUMNS.items()
+        },
+
+        "component": { # e -> data
             "attached_to":     {}, # e -> id of the object it is attached to
             "offset":          {},
             "attached_are":    {},
-            
+
             "shape":           {},
-            "size":            {},
-            "colour":          {},
-            
+
             "texture_name":    {},
             "current_texture": {}, # e -> number in atlas; not in use
-            
+
             "mask_type":       {},
             "phase":           {},
             "phase_end":       {},
         },
-        
+
+        "index": { # component -> value -> set of entities
+            name: {} for name in INDEXED
+        },
+
         "tag": { # sets of entities
-            "player": set(),
-            "bullet": set(),
-            "trail":  set(),
-            "mask":   set(),
+            tag: set() for tag in TAG_BITS
         },
     }
 
+def _resize_columns(reg, capacity):
+    n = reg["count"]
+    for name, col in reg["column"].items():
+        new = np.zeros((capacity, *col.shape[1:]), dtype=col.dtype)
+        new[:n] = col[:n]
+        reg["column"][name] = new
+
+    dense = np.zeros(capacity, dtype=reg["dense"].dtype)
+    dense[:n] = reg["dense"][:n]
+    reg["dense"] = dense
+
+def _grow_sparse(reg, capacity):
+    old = len(reg["sparse"])
+    sparse = np.full(capacity, -1, dtype=np.int32)
+    sparse[:old] = reg["sparse"]
+    reg["sparse"] = sparse
+
+    generation = np.zeros(capacity, dtype=np.uint32)
+    generation[:old] = reg["generation"]
+    reg["generation"] = generation
+
 def create_entity(reg):
-    e = reg["next_entity"]
-    reg["next_entity"] += 1
+    if reg["free"]:
+        i = heapq.heappop(reg["free"])
+    else:
+        i = reg["next_entity"]
+        reg["next_entity"] += 1
+        if i > INDEX_MASK:
+            raise RuntimeError("ecs: entity index space exhausted")
+
+    s = reg["count"]
+    if s >= len(reg["dense"]):
+        _resize_columns(reg, 2 * len(reg["dense"]))
+    if i >= len(reg["sparse"]):
+        _grow_sparse(reg, max(2 * len(reg["sparse"]), i + 1))
+
+    e = (int(reg["generation"][i]) << INDEX_BITS) | i
+    for col in reg["column"].values():
+        col[s] = 0
+    reg["sparse"][i] = s
+    reg["dense"][s] = e
+    reg["count"] = s + 1
+    reg["version"] += 1
     return e
 
-# to-do: move of entities to the freed-up space
+def create_entities(reg, n):
+    """Allocate n entities at once; they occupy the last n live slots. Returns their ids."""
+    start = reg["count"]
+    end = start + n
+    if end > len(reg["dense"]):
+        _resize_columns(reg, max(2 * len(reg["dense"]), end))
+
+    free = reg["free"]
+    recycled = [heapq.heappop(free) for _ in range(min(n, len(free)))]
+    fresh = n - len(recycled)
+    i = np.array(recycled + list(range(reg["next_entity"], reg["next_entity"] + fresh)), dtype=np.int64)
+    reg["next_entity"] += fresh
+    if fresh and reg["next_entity"] - 1 > INDEX_MASK:
+        raise RuntimeError("ecs: entity index space exhausted")
+    if len(i) and i.max() >= len(reg["sparse"]):
+        _grow_sparse(reg, max(2 * len(reg["sparse"]), int(i.max()) + 1))
+
+    es = (reg["generation"][i].astype(np.int64) << INDEX_BITS) | i
+    for col in reg["column"].values():
+        col[start:end] = 0
+    reg["sparse"][i] = np.arange(start, end, dtype=np.int32)
+    reg["dense"][start:end] = es
+    reg["count"] = end
+    reg["version"] += 1
+    return es
 
 def destroy_entity(reg, e):
+    if not is_alive(reg, e):
+        return # already destroyed, or a stale handle to a recycled index
+
+    # swap-remove: the last live slot fills the hole so the columns stay packed
+    i = e & INDEX_MASK
+    s = reg["sparse"][i]
+    last = reg["count"] - 1
+    if s != last:
+        moved = reg["dense"][last]
+        for col in reg["column"].values():
+            col[s] = col[last]
+        reg["dense"][s] = moved
+        reg["sparse"][moved & INDEX_MASK] = s
+    reg["sparse"][i] = -1
+    reg["count"] = last
+    reg["version"] += 1
+
+    reg["generation"][i] += 1
+    heapq.heappush(reg["free"], i)
+
+    _unindex(reg, [e])
     for component in reg["component"]:
         reg["component"][component].pop(e, None)
-        
+
     for tag in reg["tag"]:
         reg["tag"][tag].discard(e)
+
+def destroy_entities(reg, es):
+    """Destroy a batch of ids in one vectorized swap-remove; dead and stale ids are skipped."""
+    es = np.unique(np.asarray(es, dtype=np.int64))
+    i = es & INDEX_MASK
+    known = i < len(reg["sparse"])
+    es, i = es[known], i[known]
+    alive = (reg["sparse"][i] >= 0) & (reg["generation"][i] == es >> INDEX_BITS)
+    es, i = es[alive], i[alive]
+    if not len(es):
+        return
+
+    # holes left below the new count are filled by the survivors above it
+    slots = reg["sparse"][i]
+    end = reg["count"] - len(es)
+    tail = np.arange(end, reg["count"])
+    fillers = tail[~np.isin(tail, slots)]
+    holes = slots[slots < end]
+    for col in reg["column"].values():
+        col[holes] = col[fillers]
+    reg["dense"][holes] = reg["dense"][fillers]
+    reg["sparse"][reg["dense"][holes] & INDEX_MASK] = holes
+    reg["sparse"][i] = -1
+    reg["count"] = end
+    reg["version"] += 1
+
+    reg["generation"][i] += 1
+    for index in i.tolist():
+        heapq.heappush(reg["free"], index)
+
+    dead = es.tolist()
+    _unindex(reg, dead)
+    for component in reg["component"].values():
+        for e in dead:
+            component.pop(e, None)
+
+    for tag in reg["tag"].values():
+        tag.difference_update(dead)
+
+def compact_registry(reg):
+    """
+    Regroup live slots by tag set (all bullets contiguous, etc.) so column slices
+    and masks stay cache-friendly, and release capacity left over from a spawn burst.
+    """
+    n = reg["count"]
+    tags = view(reg, "tags")
+    if n > 1 and (tags[1:] < tags[:-1]).any():
+        order = np.argsort(tags, kind="stable")
+        for col in reg["column"].values():
+            col[:n] = col[order]
+        reg["dense"][:n] = reg["dense"][order]
+        reg["sparse"][reg["dense"][:n] & INDEX_MASK] = np.arange(n, dtype=np.int32)
+        reg["version"] += 1
+
+    capacity = len(reg["dense"])
+    if capacity > INITIAL_CAPACITY and n < capacity // 4:
+        _resize_columns(reg, max(INITIAL_CAPACITY, capacity // 2))
+
+def is_alive(reg, e):
+    if e is None or e < 0:
+        return False
+    i = e & INDEX_MASK
+    return (
+        i < len(reg["sparse"])
+        and reg["sparse"][i] >= 0
+        and reg["generation"][i] == e >> INDEX_BITS
+    )
+
+def slot_of(reg, e):
+    return int(reg["sparse"][e & INDEX_MASK])
+
+def add_tag(reg, e, tag):
+    reg["tag"][tag].add(e)
+    reg["column"]["tags"][slot_of(reg, e)] |= TAG_BITS[tag]
+    reg["version"] += 1
+
+def add_tag_many(reg, es, tag):
+    reg["tag"][tag].update(es.tolist())
+    reg["column"]["tags"][reg["sparse"][es & INDEX_MASK]] |= TAG_BITS[tag]
+    reg["version"] += 1
+
+# ------------------ value indexes ------------------
+
+def set_component(reg, name, e, value):
+    """Write a cold component, keeping its value index (if any) in step."""
+    component = reg["component"][name]
+    index = reg["index"].get(name)
+    if index is not None:
+        if e in component:
+            _discard(index, component[e], e)
+        index.setdefault(value, set()).add(e)
+    component[e] = value
+
+def find(reg, name, value):
+    """Entities whose indexed component name equals value. Do not mutate the result."""
+    return reg["index"][name].get(value, _EMPTY)
+
+def _discard(index, value, e):
+    bucket = index.get(value)
+    if bucket is not None:
+        bucket.discard(e)
+        if not bucket:
+            del index[value]
+
+def _unindex(reg, es):
+    for name, index in reg["index"].items():
+        component = reg["component"][name]
+        for e in es:
+            if e in component:
+                _discard(index, component[e], e)
+
+# ------------------ cached queries ------------------
+
+def _cached(reg, key, build):
+    hit = reg["views"].get(key)
+    if hit is not None and hit[0] == reg["version"]:
+        return hit[1]
+    value = build()
+    reg["views"][key] = (reg["version"], value)
+    return value
+
+def view(reg, name):
+    """Live part of a dense column, indexed by slot."""
+    return reg["column"][name][:reg["count"]]
+
+def query_mask(reg, *tags):
+    """Boolean mask over live slots of entities carrying every tag. Read-only, cached."""
+    bits = sum(TAG_BITS[t] for t in tags)
+    return _cached(reg, ("mask", bits), lambda: (view(reg, "tags") & bits) == bits)
+
+def tag_mask(reg, tag):
+    """Boolean mask over live slots of entities carrying tag."""
+    return query_mask(reg, tag)
@@ -1,19 +1,66 @@
 # game.py
 # High-level game API: init_game(), tick_game(), render_game()
 
+import numpy as np
 import pygame as pg
 
 import settings as S
 import keymap as K
+from input_state import get_keys
 from commands import (
+    process_commands,
     cmd_destroy,
     cmd_spawn_bullet,
     cmd_spawn_masks,
     enqueue_cmd_with_information,
     enqueue_cmd_generic,
 )
-from helpers import calculate_bullet_spawn_count, circles_overlap, clamp
+from ecs import INDEX_MASK, is_alive, slot_of, tag_mask, view
+from broadphase import query_circle, rebuild_grid
+from ccd import bounce_in_box, swept_toi
+from helpers import calculate_bullet_spawn_count
 from mask_bahaviour import masked_player_hitbox
+from profiler import profiled
+from rewind import record_step
+from scheduler import emit, make_schedule, run_systems
+
+# ------------------ fixed-step driver ------------------
+
+def step_game(reg, state, dt):
+    """One simulation step: apply pending commands, then tick unless paused."""
+    if state["game_state"] != "pause":
+        state["frame"] += 1 # paused steps are not part of the timeline (rewind, mask expiry)
+    profiled("process_commands", process_commands, reg, state)
+    # slots are stable from here until the next step, so render can lerp prev -> current
+    state["prev_position"] = view(reg, "position").copy()
+    if state["game_state"] != "pause":
+        tick_game(reg, state, dt)
+        if state["rewind"] is not None:
+            profiled("rewind.record", record_step, state["rewind"], reg, state)
+
+
+def advance_game(reg, state, frame_dt):
+    """Run as many fixed 1/SIM_HZ steps as the elapsed frame time allows.
+
+    Leftover time stays in the accumulator and becomes state["render_alpha"], the
+    fraction of a step render should interpolate by. After a hitch at most
+    MAX_CATCHUP_STEPS run; the rest of the backlog is dropped, so the game slows
+    down instead of spiralling into ever longer frames.
+    """
+    step = 1.0 / S.SIM_HZ
+    acc = state["sim_accumulator"] + frame_dt
+
+    steps = 0
+    while acc >= step and steps < S.MAX_CATCHUP_STEPS:
+        step_game(reg, state, step)
+        acc -= step
+        steps += 1
+    if acc >= step:
+        acc = 0.0
+
+    state["sim_accumulator"] = acc
+    state["render_alpha"] = acc / step
+    return steps
 
 # ------------------ tick (input + logic) ------------------
 
@@ -23,20 +70,15 @@ def tick_game(reg, state, dt):
     This function is allowed to mutate component data (movement, velocity, etc.).
     But it must NOT create/destroy entities directly — it enqueue_cmd_with_informations commands instead.
     """
-    _input_player(reg, state)
-    _update_movement_and_bounds(reg, dt)
-    _update_attached_objects(reg, state, dt)
-    _update_collisions(reg, state)
-    _input_masks(reg, state)
-    _manage_masks(reg, state)
+    run_systems(SCHEDULE, reg, state, dt)
 
 
-def _input_player(reg, state):
+def _input_player(reg, state, dt):
     p = state.get("player_eid")
-    if p is None or p not in reg["component"]["velocity"]:
+    if not is_alive(reg, p):
         return
 
-    keys = pg.key.get_pressed()
+    keys = get_keys()
     move = pg.Vector2(0, 0)
 
     move.x += keys[K.RIGHT] - keys[K.LEFT]
@@ -47,11 +89,11 @@ def _input_player(reg, state):
     if state["game_state"] != "active":
         move = pg.Vector2(0, 0)
 
-    reg["component"]["velocity"][p] = move * S.PLAYER_SPEED
+    reg["column"]["velocity"][slot_of(reg, p)] = move * S.PLAYER_SPEED
 
 
-def _input_masks(reg, state): # spawn mask only if they do not exist, stacking is allowed
-    keys = pg.key.get_pressed()
+def _input_masks(reg, state, dt): # spawn mask only if they do not exist, stacking is allowed
+    keys = get_keys()
     nothing_new = True
    
     for key, mask in K.KEY_TO_MASK.items():
@@ -66,86 +108,134 @@ def _input_masks(reg, state): # spawn mask only if they do not exist, stacking i
     enqueue_cmd_generic(state["commands"], cmd_spawn_masks)
 
 
-def _update_movement_and_bounds(reg, dt):
-    # integrate entities that have velocity+transform
-    for e, vel in list(reg["component"]["velocity"].items()):
-        if e not in reg["component"]["position"]:
-            continue
-        pos = reg["component"]["position"][e]
-        pos += vel * dt
-        reg["component"]["position"][e] = pos
-
-        # player: clamp inside window
-        if e in reg["tag"]["player"] and e in reg["component"]["size"]:
-            rad = reg["component"]["size"][e]
-            pos.x = clamp(pos.x, rad, S.SCREEN_W - rad)
-            pos.y = clamp(pos.y, rad, S.SCREEN_H - rad)
-            reg["component"]["position"][e] = pos
-
-        # bullets: bounce off window edges
-        if e in reg["tag"]["bullet"] and e in reg["component"]["size"]:
-            rad = reg["component"]["size"][e]
-
-            if pos.x - rad < 0:
-                pos.x = rad
-                vel.x = -vel.x
-            elif pos.x + rad > S.SCREEN_W:
-                pos.x = S.SCREEN_W - rad
-                vel.x = -vel.x
-
-            if pos.y - rad < 0:
-                pos.y = rad
-                vel.y = -vel.y
-            elif pos.y + rad > S.SCREEN_H:
-                pos.y = S.SCREEN_H - rad
-                vel.y = -vel.y
-
-            reg["component"]["position"][e] = pos
-            reg["component"]["velocity"][e] = vel
+def _update_movement_and_bounds(reg, state, dt):
+    pos = view(reg, "position")
+    vel = view(reg, "velocity")
+    state["step_velocity"] = vel.copy() # what collisions sweep along, before any bounce
+
+    rad = view(reg, "size")[:, None]
+    lo = rad
+    hi = np.array((S.SCREEN_W, S.SCREEN_H), dtype=np.float32) - rad
+
+    # bullets: reflected exactly off the window edges, however far they travel this step
+    bullets = tag_mask(reg, "bullet")
+    bounce_in_box(pos, vel, bullets, lo, hi, dt)
+
+    # the rest: integrate; the player is clamped inside the window
+    rest = ~bullets
+    pos[rest] += vel[rest] * dt
+    np.copyto(pos, np.clip(pos, lo, hi), where=tag_mask(reg, "player")[:, None])
             
 
 def _update_attached_objects(reg, state, dt):
+    col = reg["column"]["position"]
     for mask in reg["tag"]["mask"]:
         if state["mask_engagement"][reg["component"]["mask_type"][mask]]:
-            reg["component"]["position"][mask] = reg["component"]["position"][state["player_eid"]]
-
-
-def _update_collisions(reg, state):
+            col[slot_of(reg, mask)] = col[slot_of(reg, state["player_eid"])]
+
+
+def _update_broadphase(reg, state, dt):
+    rebuild_grid(state["broadphase"], reg, tag_mask(reg, "bullet"))
+
+
+def _swept_player_hits(reg, state, ppos, prad, dt):
+    """Ids of the bullets that touched the player at any time during this step, earliest first."""
+    start = state["prev_position"]
+    vel0 = state["step_velocity"]
+    bullets = tag_mask(reg, "bullet")
+    if not bullets.any():
+        return np.zeros(0, dtype=np.int64)
+
+    q0 = start[slot_of(reg, state["player_eid"])]
+    u = (ppos - q0) / dt
+    # the grid holds end positions: a bullet that touched the player during the step ended
+    # at most (bullet speed + player speed) * dt further away than contact distance
+    speed = np.sqrt(np.einsum("ij,ij->i", vel0[bullets], vel0[bullets]).max())
+    cand = query_circle(state["broadphase"], reg, ppos, prad + (speed + np.hypot(*u)) * dt)
+    if not len(cand):
+        return cand
+
+    slots = reg["sparse"][cand & INDEX_MASK]
+    rb = view(reg, "size")[slots]
+    hi = np.array((S.SCREEN_W, S.SCREEN_H), dtype=np.float32) - rb[:, None]
+    toi = swept_toi(start[slots], vel0[slots], rb[:, None], hi, rb + prad, q0, u, dt)
+    order = np.argsort(toi, kind="stable")
+    return cand[order[np.isfinite(toi[order])]]
+
+def _update_collisions(reg, state, dt):
     p = state.get("player_eid")
 
     ppos, prad = masked_player_hitbox(reg, state)
+    if ppos is None:
+        return
 
     cmd_buf = state["commands"]
+    colour = reg["column"]["colour"]
 
-    # iterate bullets without mutating sets/dicts; enqueue_cmd_with_information destroy/spawn instead
+    # swept test: a bullet passing through the player within one step still hits; destroy/spawn are enqueued
     if state["game_state"] != "death":
-        for b in list(reg["tag"]["bullet"]):
-            if b not in reg["component"]["position"] or b not in reg["component"]["size"]:
-                continue
-    
-            bpos = reg["component"]["position"][b]
-            brad = reg["component"]["size"][b]
-    
-            if circles_overlap(ppos, prad, bpos, brad):
-                state["hits"] += 1
-    
-                reg["component"]["colour"][p] = reg["component"]["colour"][b]
-                # destroy bullet and spawn a new
-                enqueue_cmd_with_information(cmd_buf, cmd_destroy(b))
-                enqueue_cmd_generic(
-                    cmd_buf,
-                    cmd_spawn_bullet,
-                    calculate_bullet_spawn_count(len(reg["tag"]["bullet"])),
-                )
-                state["mana"]+= S.MANA_PER_HIT
-
-def _manage_masks(reg, state):
+        for b in _swept_player_hits(reg, state, ppos, prad, dt).tolist():
+            state["hits"] += 1
+
+            colour[slot_of(reg, p)] = colour[slot_of(reg, b)]
+            # destroy bullet and spawn a new
+            enqueue_cmd_with_information(cmd_buf, cmd_destroy(b))
+            enqueue_cmd_with_information(
+                cmd_buf,
+                cmd_spawn_bullet(calculate_bullet_spawn_count(len(reg["tag"]["bullet"]))),
+            )
+            state["mana"]+= S.MANA_PER_HIT
+            emit(state, "mana_changed")
+
+def _manage_masks(reg, state, dt):
     cmd_buf = state["commands"]
     
     for mask in reg["tag"]["mask"]:
         if state["frame"] >= reg["component"]["phase_end"][mask]:
             enqueue_cmd_with_information(cmd_buf, cmd_destroy(mask))
             state["mask_engagement"][reg["component"]["mask_type"][mask]] = False
-            
-    
-    
\ No newline at end of file
+            emit(state, "mask_expired")
+
+
+# ------------------ schedule ------------------
+# Systems run by tick_game, see scheduler.py. Masks last seconds, so their bookkeeping
+# runs every MASK_UPDATE_EVERY steps: expiry lands at most that late, and render draws
+# masks at the player's position, not at the mask entity's; moving them is skipped while
+# neither the player nor the masks moved. Buying a mask only depends on the keys, mana
+# and what is engaged, so it runs on the events that change those:
+#   keys_changed  state_key_processing, when the key mask differs from its previous call
+#   mana_changed  collisions, per hit
+#   mask_expired  manage_masks
+#   state_loaded  state_key_processing, after a quickload or a rewind seek
+
+def _player_position(reg, state):
+    p = state["player_eid"]
+    return tuple(reg["column"]["position"][slot_of(reg, p)].tolist()) if is_alive(reg, p) else None
+
+SIGNATURES = {
+    "player_position": _player_position,
+    "mask_positions": lambda reg, state: tuple(map(tuple, view(reg, "position")[tag_mask(reg, "mask")].tolist())),
+    "mask_engagement": lambda reg, state: tuple(state["mask_engagement"].values()),
+}
+
+SYSTEMS = (
+    {"name": "input_player", "fn": _input_player, "order": 0,
+     "reads": ("keys", "game_state"), "writes": ("velocity",)},
+    {"name": "movement_and_bounds", "fn": _update_movement_and_bounds, "order": 1,
+     "reads": ("position", "velocity", "size"), "writes": ("position", "velocity", "step_velocity")},
+    {"name": "attached_objects", "fn": _update_attached_objects, "order": 2, "every": "MASK_UPDATE_EVERY",
+     "skip_unchanged": True,
+     "reads": ("player_position", "mask_positions", "mask_engagement"), "writes": ("position",)},
+    {"name": "broadphase", "fn": _update_broadphase, "order": 3,
+     "reads": ("position",), "writes": ("broadphase",)},
+    {"name": "collisions", "fn": _update_collisions, "order": 4,
+     "reads": ("position", "size", "prev_position", "step_velocity", "broadphase"),
+     "writes": ("colour", "hits", "mana", "commands")},
+    {"name": "input_masks", "fn": _input_masks, "order": 5,
+     "on": ("keys_changed", "mana_changed", "mask_expired", "state_loaded"),
+     "reads": ("keys", "mana", "mask_engagement"), "writes": ("mana", "mask_engagement", "commands")},
+    {"name": "manage_masks", "fn": _manage_masks, "order": 6, "every": "MASK_UPDATE_EVERY",
+     "reads": ("phase_end", "frame"), "writes": ("mask_engagement", "commands")},
+)
+
+SCHEDULE = make_schedule(SYSTEMS, SIGNATURES)
@@ -0,0 +1,138 @@
+# headless.py
+# Headless deterministic simulation and tick benchmark.
+# Runs step_game (process_commands + tick_game) without a window (SDL dummy video driver),
+# with a seeded RNG and a fixed dt, so a run is reproducible and can be timed in CI.
+#
+#   python headless.py --frames 2000 --seed 1 --counts 10 100 500 1000 [--systems]
+
+import argparse
+import copy
+import os
+import time
+from contextlib import contextmanager
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame as pg
+
+import settings as S
+from commands import cmd_spawn_bullet, enqueue_cmd_with_information, process_commands
+from game import step_game
+from initalisation import init_game
+from scheduler import print_report
+
+BENCH_COUNTS = (10, 100, 500, 1000)
+
+# bench games keep their bullet count: every hit replaces its bullet with exactly one new one
+HOLD_COUNT_OVERRIDES = {"BULLET_SPAWN_AT_HIT": 1, "BULLET_CRITICAL_MASS": 2**31, "REWIND_ENABLED": False}
+
+@contextmanager
+def override_settings(overrides):
+    """
+    Set settings values for the duration of the block; "MASKS.1.cost" reaches into dicts.
+    Settings must be read when they are used (S.NAME at call time, never copied into a
+    module constant or a default argument) for an override to reach them.
+    """
+    tops = {name.split(".")[0] for name in overrides}
+    saved = {top: getattr(S, top) for top in tops}
+    try:
+        for top in tops:
+            setattr(S, top, copy.deepcopy(saved[top]))
+        for name, value in overrides.items():
+            top, *path = name.split(".")
+            if not path:
+                setattr(S, top, value)
+                continue
+            target = getattr(S, top)
+            for key in path[:-1]:
+                target = target[key]
+            target[path[-1]] = value
+        yield
+    finally:
+        for top, value in saved.items():
+            setattr(S, top, value)
+
+def init_headless():
+    pg.init()
+    # game surfaces and atlases are converted against the display format
+    pg.display.set_mode((S.SCREEN_W, S.SCREEN_H))
+
+def make_headless_game(seed, bullet_count=None):
+    if bullet_count is None:
+        bullet_count = S.BULLET_START_COUNT
+    reg, state = init_game(seed)
+    state["game_state"] = "active"
+    enqueue_cmd_with_information(
+        state["commands"],
+        cmd_spawn_bullet(max(0, bullet_count - S.BULLET_START_COUNT)),
+    )
+    process_commands(reg, state)
+    return reg, state
+
+def run_frames(reg, state, frames, dt=None, live=None):
+    """
+    Step the simulation frames times, by dt (default: one 1/SIM_HZ step); returns
+    per-frame wall time in seconds. live: optional array that receives the live bullet
+    count after every step.
+    """
+    dt = dt or 1.0 / S.SIM_HZ
+    times = np.empty(frames)
+    clock = time.perf_counter
+    for i in range(frames):
+        t0 = clock()
+        step_game(reg, state, dt)
+        times[i] = clock() - t0
+        if live is not None:
+            live[i] = len(reg["tag"]["bullet"])
+    return times
+
+def bench(counts=BENCH_COUNTS, frames=1000, seed=0, warmup=20):
+    rows = []
+    for count in counts:
+        live = np.empty(frames)
+        with override_settings(HOLD_COUNT_OVERRIDES): # time the tick alone, at count bullets
+            reg, state = make_headless_game(seed, count)
+            run_frames(reg, state, warmup)
+            times = run_frames(reg, state, frames, live=live)
+        p50, p95, p99 = np.percentile(times, (50, 95, 99)) * 1000.0
+        rows.append({
+            "bullets": count,
+            "live_mean": live.mean(),
+            "ticks_per_s": frames / times.sum(),
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "p99_ms": p99,
+            "end_bullets": len(reg["tag"]["bullet"]),
+            "hits": state["hits"],
+        })
+    return rows
+
+def print_bench(rows):
+    print(f"{'bullets':>8} {'live':>7} {'ticks/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'end':>6} {'hits':>6}")
+    for r in rows:
+        print(
+            f"{r['bullets']:>8} {r['live_mean']:>7.1f} {r['ticks_per_s']:>10.0f} {r['p50_ms']:>8.3f} "
+            f"{r['p95_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['end_bullets']:>6} {r['hits']:>6}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless tick benchmark")
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--counts", type=int, nargs="+", default=list(BENCH_COUNTS))
+    parser.add_argument("--systems", action="store_true", help="also print the per-system cost of the ticks")
+    args = parser.parse_args()
+
+    init_headless()
+    rows = bench(args.counts, args.frames, args.seed)
+    print_bench(rows)
+    if args.systems:
+        print()
+        print_report()
+    pg.quit()
+
+
+if __name__ == "__main__":
+    main()
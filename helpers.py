@@ -2,51 +2,36 @@
 
 import random
 
-import pygame as pg
+import numpy as np
 
 import settings as S
 
 
-def clamp(x, a, b):
-    return a if x < a else b if x > b else x
+def random_edge_positions(n, radius, rng):
+    """(n, 2) float32 random positions on the window edges, radius inside; rng is a numpy Generator."""
+    weights = np.array([S.SCREEN_W, S.SCREEN_H, S.SCREEN_W, S.SCREEN_H], dtype=float)
+    edge = rng.choice(4, size=n, p=weights / weights.sum()) # top, bottom, left, right
 
+    pos = np.empty((n, 2), dtype=np.float32)
+    pos[:, 0] = rng.uniform(radius, S.SCREEN_W - radius, n)
+    pos[:, 1] = rng.uniform(radius, S.SCREEN_H - radius, n)
+    pos[edge == 0, 1] = radius
+    pos[edge == 1, 1] = S.SCREEN_H - radius
+    pos[edge == 2, 0] = radius
+    pos[edge == 3, 0] = S.SCREEN_W - radius
+    return pos
 
-def random_vel_norm():
-    return pg.Vector2(1, 0).rotate(random.uniform(0, 360))
 
-
-def circles_overlap(p1, r1, p2, r2):
-    d = p1 - p2
-    rr = r1 + r2
-    return d.x * d.x + d.y * d.y <= rr * rr
-
-
-def random_edge_position(radius):
-    edge = random.choices(
-        ["top", "bottom", "left", "right"],
-        weights=[S.SCREEN_W, S.SCREEN_H, S.SCREEN_W, S.SCREEN_H]
-    )[0]
-
-
-    if edge == "top":
-        return pg.Vector2(random.uniform(radius, S.SCREEN_W - radius), radius)
-    elif edge == "bottom":
-        return pg.Vector2(
-            random.uniform(radius, S.SCREEN_W - radius), S.SCREEN_H - radius
-        )
-    elif edge == "left":
-        return pg.Vector2(radius, random.uniform(radius, S.SCREEN_H - radius))
-    else:  # right
-        return pg.Vector2(
-            S.SCREEN_W - radius, random.uniform(radius, S.SCREEN_H - radius)
-        )
-
-
-def aim_at(origin, target):
-    direction = pg.Vector2(target) - pg.Vector2(origin)
-    if direction.length_squared() == 0:
-        return random_vel_norm()
-    return direction.normalize()
+def aim_at_many(origins, target, rng):
+    """Unit vectors from each origin to target, random where they coincide."""
+    direction = np.asarray(target, dtype=np.float32) - origins
+    length = np.hypot(direction[:, 0], direction[:, 1])
+    zero = length == 0
+    if zero.any():
+        angle = rng.uniform(0, 2 * np.pi, int(zero.sum()))
+        direction[zero] = np.stack((np.cos(angle), np.sin(angle)), axis=1)
+        length[zero] = 1.0
+    return direction / length[:, None]
 
 
 def add_alpha(color, alpha):
@@ -54,21 +39,21 @@ def add_alpha(color, alpha):
         return color[:3] + (alpha,)
     return (*color, alpha)
 
-def rand_colour():
-    r = random.randint(0, 255)
-    g = random.randint(0, 255)
-    b = random.randint(0, 255)
+def rand_colour(rng=random):
+    r = rng.randint(0, 255)
+    g = rng.randint(0, 255)
+    b = rng.randint(0, 255)
     return (r, g, b)
 
-def rand_colour_vivid():
-    r = random.randint(100, 255)
-    g = random.randint(100, 255)
-    b = random.randint(100, 255)
+def rand_colour_vivid(rng=random):
+    r = rng.randint(100, 255)
+    g = rng.randint(100, 255)
+    b = rng.randint(100, 255)
     return (r, g, b)
 
 
-def make_up_colours(n=10):
-    return tuple(rand_colour_vivid() for _ in range(n))
+def make_up_colours(n=10, rng=random):
+    return tuple(rand_colour_vivid(rng) for _ in range(n))
 
 def calculate_bullet_spawn_count(current_bullet_count) -> int:
     """Calculate dynamic bullet spawn count based on current game state"""
@@ -78,10 +63,3 @@ def calculate_bullet_spawn_count(current_bullet_count) -> int:
     if current_bullet_count <S.BULLET_MAX_MASS-5:
         return S.BULLET_SPAWN_AT_HIT*3
     return 0
-
-def entity_exists(reg, state, component, property):
-    for e in reg["component"][component]:
-        if reg["component"][component][e] == property:
-            return True
-
-    return False
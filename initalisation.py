@@ -1,52 +1,70 @@
 import random
 
-import pygame as pg
+import numpy as np
 
 import settings as S
-import texture_settings
 from commands import (
     cmd_spawn_bullet,
     cmd_spawn_player,
     enqueue_cmd_generic,
+    enqueue_cmd_with_information,
     make_command_buffer,
 )
 from ecs import make_registry
 from helpers import make_up_colours
 
-from atlas import load_game_atlas
+from assets import fresh_trail_layer
+from broadphase import make_grid
+from render import make_dirty_tracker, make_sprite_cache
+from rewind import make_rewind
 
 
-def init_game():
+def init_game(seed=None):
+    """Build a fresh registry and state. A fixed seed makes the whole run reproducible."""
     reg = make_registry()
-    colour_pallete_size = random.randint(S.COLOUR_VARIETY_MIN, S.COLOUR_VARIETY_MAX)
+    rng = random.Random(seed)
+    colour_pallete_size = rng.randint(S.COLOUR_VARIETY_MIN, S.COLOUR_VARIETY_MAX)
     state = {
         "game_state": "pause",
-        "frame": 0,
+        "frame": 0,          # simulation steps
+        "render_frame": 0,   # rendered frames; drives animation and trail fading
+
+        "sim_accumulator": 0.0, # unsimulated time, < 1/SIM_HZ between frames
+        "render_alpha": 1.0,    # interpolation factor between prev and current positions
+        "prev_position": None,  # position column as of the start of the last step
+        "step_velocity": None,  # velocity column the last step integrated, before bounces
         
         "hits": 0,
         "mana": 0,
         
+        "rng": rng,                         # every gameplay random draw goes through this
+        "np_rng": np.random.default_rng(rng.getrandbits(64)), # ... or this, for batched draws
         "commands": make_command_buffer(),  # pending commands applied by main
         "player_eid": None,                 # will be set by spawn_player command
+        "broadphase": make_grid(),          # rebuilt every tick over the bullets
         
         "mask_engagement": {
             mask : False for mask in S.MASKS
         },
 
         "pallete_size": colour_pallete_size,
-        "color_pallete": make_up_colours(colour_pallete_size),
-        
-        # surfaces to cull static objects to
-        "cumulative_static_surface": pg.Surface((S.SCREEN_W, S.SCREEN_W), pg.SRCALPHA).convert_alpha(),
-        "new_tick_static_surface": pg.Surface((S.SCREEN_W, S.SCREEN_W), pg.SRCALPHA).convert_alpha(),
+        "color_pallete": make_up_colours(colour_pallete_size, rng),
         
-        "game_atlases" : {
-            name: load_game_atlas(name, cfg, texture_settings.texture_folder) # "frames", "length"
-            for name, cfg in texture_settings.game.items()
-        }
+        "systems": {}, # scheduler memory: what each system saw after its last run
+        "events": {},  # event -> times raised, see scheduler.emit
+
+        "rewind": make_rewind() if S.REWIND_ENABLED else None, # history of recent steps
+        "rewinding": False,                 # REWIND held: the simulation stands still
+        "held_keys": 0,                     # key mask at the last state_key_processing, for presses
+
+        # opaque layer that trails are stamped onto and fade out on; shared across restarts
+        "trail": fresh_trail_layer(),
     }
 
+    state["sprite_cache"] = make_sprite_cache(state["color_pallete"]) # invalidated with the palette
+    state["dirty"] = make_dirty_tracker() # screen areas to restore with S.DIRTY_RECTS
+
     enqueue_cmd_generic(state["commands"], cmd_spawn_player)
-    enqueue_cmd_generic(state["commands"], cmd_spawn_bullet, S.BULLET_START_COUNT)
+    enqueue_cmd_with_information(state["commands"], cmd_spawn_bullet(S.BULLET_START_COUNT))
 
     return reg, state
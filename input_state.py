@@ -0,0 +1,142 @@
+# input_state.py
+# Per-frame input snapshot. The keyboard is read once per frame by read_frame(); game
+# code reads that snapshot through get_keys() instead of calling pg.key.get_pressed().
+#
+# A session can be recorded to a compact file (seed + per-frame key bitmask and dt) and
+# replayed frame-exact: replay feeds the recorded keys and dt back in, so the fixed-step
+# simulation takes exactly the same steps, restarts and mask activations included.
+# Quickloads read the quicksave through read_quicksave(): a recording keeps the bytes
+# each quickload read and replay loads those, so it does not depend on the file on disk.
+#
+#   python main.py --record session.cdr
+#   python main.py --replay session.cdr
+
+import os
+import struct
+import zlib
+
+import numpy as np
+import pygame as pg
+
+import keymap as K
+
+# every key the game reads; bit i of a frame mask is TRACKED_KEYS[i]
+TRACKED_KEYS = (
+    K.UP, K.DOWN, K.LEFT, K.RIGHT,
+    K.RESTART, K.PAUSE, K.GO, K.QUICKSAVE, K.QUICKLOAD, K.REWIND,
+    *K.KEY_TO_MASK,
+)
+
+MAGIC = b"CDIR"
+VERSION = 2 # 2: quickloaded snapshots follow the frames
+_HEADER = struct.Struct("<4sHIIH") # magic, version, seed, frames, key count
+_BLOB = struct.Struct("<i") # quickload: snapshot length, -1 when there was no quicksave
+FRAME_DTYPE = np.dtype([("keys", "<u4"), ("dt", "<f4")])
+
+_current = {
+    "keys": {k: False for k in TRACKED_KEYS},
+    "input": None, # the session made by make_input, for quickloads
+}
+
+def get_keys():
+    """This frame's key snapshot: {key: bool} for every key in TRACKED_KEYS."""
+    return _current["keys"]
+
+def pack_keys(keys):
+    return sum(1 << i for i, k in enumerate(TRACKED_KEYS) if keys[k])
+
+def unpack_keys(mask):
+    return {k: bool(mask >> i & 1) for i, k in enumerate(TRACKED_KEYS)}
+
+def set_keys(mask):
+    """Install a snapshot directly, e.g. from a scripted policy in headless runs."""
+    _current["keys"] = unpack_keys(mask)
+
+def make_input(record_path=None, replay_path=None, seed=None):
+    inp = {
+        "mode": "live",
+        "path": None,
+        "seed": seed,
+        "frames": [], # record: list of (mask, dt); replay: FRAME_DTYPE array
+        "index": 0,
+        "quickloads": [], # snapshot bytes (or None) read by each quickload, in order
+        "quickload_index": 0,
+    }
+    if replay_path:
+        inp.update(load_recording(replay_path))
+        inp["mode"] = "replay"
+    elif record_path:
+        inp["mode"] = "record"
+        inp["path"] = record_path
+    _current["input"] = inp
+    return inp
+
+def read_quicksave(path):
+    """The quicksave's bytes, or None when there is none. Replays read the recorded ones."""
+    inp = _current["input"]
+    if inp is not None and inp["mode"] == "replay":
+        i = inp["quickload_index"]
+        inp["quickload_index"] += 1
+        return inp["quickloads"][i] if i < len(inp["quickloads"]) else None
+
+    data = None
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            data = f.read()
+    if inp is not None and inp["mode"] == "record":
+        inp["quickloads"].append(data)
+    return data
+
+def read_frame(inp, dt):
+    """
+    Pump events and take this frame's snapshot.
+    Returns (quitting, dt): in replay, dt is the recorded one and quitting is set when it
+    runs out. A frame that quits is never simulated, so it is not recorded either.
+    """
+    quitting = any(event.type == pg.QUIT for event in pg.event.get())
+
+    if inp["mode"] == "replay":
+        if inp["index"] >= len(inp["frames"]):
+            return True, dt
+        mask, dt = inp["frames"][inp["index"]].tolist()
+        inp["index"] += 1
+    else:
+        mask = pack_keys(pg.key.get_pressed())
+        if inp["mode"] == "record" and not quitting:
+            dt = float(np.float32(dt)) # play with exactly the dt the file will hold
+            inp["frames"].append((mask, dt))
+
+    set_keys(mask)
+    return quitting, dt
+
+def save_recording(inp):
+    frames = np.array(inp["frames"], dtype=FRAME_DTYPE)
+    with open(inp["path"], "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, inp["seed"], len(frames), len(TRACKED_KEYS)))
+        f.write(np.array(TRACKED_KEYS, dtype="<u4").tobytes())
+        f.write(zlib.compress(frames.tobytes()))
+        for data in inp["quickloads"]:
+            f.write(_BLOB.pack(-1 if data is None else len(data)))
+            f.write(data or b"")
+
+def load_recording(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, seed, count, n_keys = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"input_state: {path} is not a version {VERSION} recording")
+    keys_end = _HEADER.size + 4 * n_keys
+    keys = tuple(np.frombuffer(data[_HEADER.size:keys_end], dtype="<u4").tolist())
+    if keys != TRACKED_KEYS:
+        raise ValueError(f"input_state: {path} was recorded with a different key map")
+    stream = zlib.decompressobj()
+    frames = np.frombuffer(stream.decompress(data[keys_end:]), dtype=FRAME_DTYPE)
+    if len(frames) != count:
+        raise ValueError(f"input_state: {path} is truncated")
+
+    quickloads, rest, at = [], stream.unused_data, 0
+    while at < len(rest):
+        (n,), at = _BLOB.unpack_from(rest, at), at + _BLOB.size
+        quickloads.append(None if n < 0 else rest[at:at + n])
+        at += max(n, 0)
+    return {"seed": seed, "frames": frames, "path": path, "quickloads": quickloads}
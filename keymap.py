@@ -12,6 +12,10 @@ RESTART = pg.K_r
 PAUSE = pg.K_ESCAPE
 GO = pg.K_g
 
+QUICKSAVE = pg.K_F5
+QUICKLOAD = pg.K_F9
+REWIND = pg.K_BACKSPACE
+
 # nth mask to n key
 KEY_TO_MASK = {
     getattr(pg, f"K_{i}"): str(i)
@@ -1,49 +1,80 @@
+import argparse
 import asyncio
+import random
 
 import pygame as pg
 
 import settings as S
-from app_init import init_app, poll_quit, shutdown_app
-from commands import process_commands
-from game import tick_game
+from app_init import init_app, shutdown_app
+from game import advance_game
 from initalisation import init_game
+from input_state import make_input, read_frame, save_recording
+from profiler import end_frame, export_trace, is_enabled, profiled
+from quality import observe_frame
 from render import render
+from sim_thread import latest_frame, start_sim, stop_sim
 from state_handling import state_key_processing
-# import FPS_track
+from FPS_track import FPSTracker
 
-async def main():
+async def main(record_path=None, replay_path=None):
     screen, clock, font = init_app()
-    reg, state = init_game()
+    # a recorded session needs its seed; otherwise pick a fresh one as before
+    inp = make_input(record_path, replay_path, seed=random.getrandbits(32))
+    reg, state = init_game(inp["seed"])
     state["game_state"] = "active"
 
+    # record/replay need steps locked to rendered frames
+    sim = start_sim(reg, state) if S.SIM_THREAD and inp["mode"] == "live" else None
+
     # process_commands(reg, state)
-    # fps = FPS_track.FPSTracker()
+    fps = FPSTracker(pos=(8, S.SCREEN_H - 30), clock=clock)
+    overlays = (fps.draw,) if S.SHOW_FPS else ()
 
     running = True
+    rendered = 0 # state belongs to the sim thread when there is one
     while running:
-        state["frame"]+= 1
+        rendered += 1
+        if sim is None:
+            state["render_frame"] = rendered
         
-        if poll_quit():
+        dt = profiled("wait", fps.tick, S.TARGET_FPS)
+        observe_frame(clock.get_rawtime() / 1000.0) # last frame's work, without the cap's sleep
+
+        quitting, dt = profiled("input", read_frame, inp, dt) # the only keyboard read this frame
+        if quitting:
             running = False
             continue
 
-        dt = clock.tick(S.TARGET_FPS) / 1000.0 
-        # dt = fps.tick(S.TARGET_FPS)
+        if sim is None:
+            profiled("state_key_processing", state_key_processing, reg, state)
+            if not state["rewinding"]:
+                advance_game(reg, state, dt) # fixed SIM_HZ steps; sets render_alpha
+            rects = render(screen, reg, state, font, overlays) # None: the whole screen changed
+        else:
+            # the worker steps on its own clock; draw the newest frame it published
+            frame_reg, frame_state = latest_frame(sim, rendered)
+            rects = render(screen, frame_reg, frame_state, font, overlays)
 
-        state_key_processing(reg, state)
-        process_commands(reg, state)
-        if state["game_state"] != "pause":
-            tick_game(reg, state, dt)
-        render(screen, reg, state, font)
-
-        # fps.draw(screen)
-        
-        pg.display.flip()
+        if rects is None:
+            profiled("display.flip", pg.display.flip)
+        elif rects:
+            profiled("display.update", pg.display.update, rects)
+        end_frame()
 
         await asyncio.sleep(0)
 
+    if sim is not None:
+        stop_sim(sim)
+    if inp["mode"] == "record":
+        save_recording(inp)
+    if is_enabled():
+        export_trace()
     shutdown_app()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Colour Defense")
+    parser.add_argument("--record", metavar="FILE", help="record input to FILE for replay")
+    parser.add_argument("--replay", metavar="FILE", help="replay a recorded session frame-exact")
+    args = parser.parse_args()
+    asyncio.run(main(args.record, args.replay))
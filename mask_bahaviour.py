@@ -1,13 +1,14 @@
 # mask_bahaviour.py
 
+from ecs import is_alive, slot_of
+
 def masked_player_hitbox(reg, state):
     p = state.get("player_eid")
-    ppos = reg["component"]["position"][p]
-    prad = reg["component"]["size"][p]
-    if p is None or p not in reg["component"]["position"] or p not in reg["component"]["size"]:
-        return ppos, prad
+    if not is_alive(reg, p):
+        return None, 0.0
 
-    ppos = reg["component"]["position"][p]
-    prad = reg["component"]["size"][p]
+    s = slot_of(reg, p)
+    ppos = reg["column"]["position"][s]
+    prad = reg["column"]["size"][s]
     
-    return ppos, prad
\ No newline at end of file
+    return ppos, prad
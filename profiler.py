@@ -0,0 +1,125 @@
+# profiler.py
+# Per-stage frame profiler. Stages are timed with profiled(name, fn, *args); the time of
+# every stage is summed per frame and end_frame() commits the frame into fixed-size ring
+# buffers (one NumPy array per stage). When disabled, profiled() is a plain call.
+#
+# Usage: set settings.PROFILER_ENABLED, then draw_overlay() each frame and
+# export_trace() on exit (CSV and JSON next to settings.PROFILER_EXPORT).
+
+import json
+import threading
+import time
+
+import numpy as np
+import pygame as pg
+
+import settings as S
+
+_clock = time.perf_counter
+_main = threading.main_thread() # stages are summed per frame of the main loop
+
+_profiler = {
+    "enabled": S.PROFILER_ENABLED,
+    "capacity": S.PROFILER_FRAMES,
+    "frames": 0,         # committed frames, ever; ring index is frames % capacity
+    "ring": {},          # stage -> float64[capacity] seconds
+    "current": {},       # stage -> seconds accumulated in the frame being recorded
+    "last_end": None,    # perf_counter of the previous end_frame
+    "overlay": None,     # cached overlay surface, refreshed every PROFILER_OVERLAY_EVERY frames
+}
+
+def set_enabled(enabled=True):
+    _profiler["enabled"] = enabled
+    _profiler["last_end"] = None
+
+def is_enabled():
+    return _profiler["enabled"]
+
+def profiled(name, fn, *args):
+    """Call fn(*args), charging its wall time to stage name. Only the main thread is recorded."""
+    if not _profiler["enabled"] or threading.current_thread() is not _main:
+        return fn(*args)
+    t0 = _clock()
+    result = fn(*args)
+    current = _profiler["current"]
+    current[name] = current.get(name, 0.0) + (_clock() - t0)
+    return result
+
+def end_frame():
+    """Commit the stage times of this frame, plus the whole frame time, to the rings."""
+    p = _profiler
+    if not p["enabled"]:
+        return
+    now = _clock()
+    if p["last_end"] is not None:
+        p["current"]["frame"] = now - p["last_end"]
+    p["last_end"] = now
+
+    i = p["frames"] % p["capacity"]
+    for name in p["current"].keys() - p["ring"].keys():
+        p["ring"][name] = np.zeros(p["capacity"])
+    for name, ring in p["ring"].items():
+        ring[i] = p["current"].get(name, 0.0)
+    p["current"].clear()
+    p["frames"] += 1
+
+def _window():
+    """Recorded rows in chronological order: stage -> seconds array."""
+    p = _profiler
+    n = min(p["frames"], p["capacity"])
+    start = p["frames"] % p["capacity"] if p["frames"] > p["capacity"] else 0
+    return {name: np.roll(ring, -start)[:n] for name, ring in p["ring"].items()}
+
+def summary():
+    """stage -> {"p50", "p95", "p99", "mean"} in milliseconds over the ring window."""
+    out = {}
+    for name, samples in _window().items():
+        if len(samples):
+            p50, p95, p99 = np.percentile(samples, (50, 95, 99)) * 1000.0
+            out[name] = {"p50": p50, "p95": p95, "p99": p99, "mean": samples.mean() * 1000.0}
+    return out
+
+def draw_overlay(surface, font, pos=(8, 36)):
+    """Blit the stage table; returns its rect, or None when disabled."""
+    p = _profiler
+    if not p["enabled"]:
+        return
+    if p["overlay"] is None or p["frames"] % S.PROFILER_OVERLAY_EVERY == 0:
+        stats = summary()
+        lines = [f"{'stage':<26}{'p50':>7}{'p95':>7}{'p99':>7}  ms"]
+        for name in sorted(stats, key=lambda n: (n != "frame", n)):
+            s = stats[name]
+            lines.append(f"{name:<26}{s['p50']:>7.2f}{s['p95']:>7.2f}{s['p99']:>7.2f}")
+        rows = [font.render(line, True, (255, 255, 255)) for line in lines]
+        pad = 4
+        overlay = pg.Surface(
+            (max(r.get_width() for r in rows) + 2 * pad, sum(r.get_height() for r in rows) + 2 * pad),
+            pg.SRCALPHA,
+        )
+        overlay.fill((0, 0, 0, 170))
+        y = pad
+        for r in rows:
+            overlay.blit(r, (pad, y))
+            y += r.get_height()
+        p["overlay"] = overlay
+    return surface.blit(p["overlay"], pos)
+
+def export_trace(basename=S.PROFILER_EXPORT):
+    """Write the ring window as <basename>.csv (one row per frame) and <basename>.json."""
+    window = _window()
+    if not window:
+        return
+    names = sorted(window)
+    rows = np.stack([window[n] for n in names], axis=1) * 1000.0
+
+    with open(f"{basename}.csv", "w") as f:
+        f.write(",".join(f"{n}_ms" for n in names) + "\n")
+        for row in rows.tolist():
+            f.write(",".join(f"{v:.4f}" for v in row) + "\n")
+
+    with open(f"{basename}.json", "w") as f:
+        json.dump({
+            "stages": names,
+            "frames_ms": rows.round(4).tolist(),
+            "summary_ms": summary(),
+        }, f)
@@ -0,0 +1,94 @@
+# quality.py
+# Adaptive quality governor. Each frame main reports how long the frame's work took (the
+# clock's raw time, without the FPS cap's sleep); every QUALITY_WINDOW frames the p90 of
+# those times is compared with the 1 / TARGET_FPS budget and the quality level steps
+# down (cheaper) or back up. Hysteresis: stepping down and up use different thresholds,
+# and no decision is taken for QUALITY_HOLD frames after a change.
+#
+# One level step can change the busy time by more than the gap between the thresholds,
+# so under steady load the governor would bounce between two neighbours. Each level
+# remembers how often it was left for being too slow; stepping back up into it waits
+# QUALITY_HOLD * 2**strikes frames, at most QUALITY_BACKOFF_MAX.
+#
+# Levels are defined in settings.QUALITY_LEVELS, best first; render reads the current
+# one through quality(). Every change is kept in decision_log(), and printed when the
+# profiler is enabled.
+
+import numpy as np
+
+import settings as S
+from profiler import is_enabled as profiling
+
+_governor = {
+    "enabled": S.QUALITY_GOVERNOR,
+    "level": 0,
+    "samples": np.zeros(S.QUALITY_WINDOW), # busy seconds of the latest frames
+    "count": 0,     # samples since the last decision
+    "hold": 0,      # frames left before the next decision may be taken
+    "up_hold": 0,   # frames left before stepping up may be decided
+    "strikes": {},  # level -> times it was stepped down from
+    "frames": 0,    # frames observed, ever
+    "log": [],
+}
+
+def set_enabled(enabled=True):
+    _governor["enabled"] = enabled
+    if not enabled:
+        _governor["level"] = 0
+
+def quality():
+    """The current quality level: a dict from settings.QUALITY_LEVELS."""
+    return S.QUALITY_LEVELS[_governor["level"]]
+
+def decision_log():
+    return list(_governor["log"])
+
+def _change(step, p90, budget):
+    g = _governor
+    old = S.QUALITY_LEVELS[g["level"]]
+    new = S.QUALITY_LEVELS[g["level"] + step]
+    traded = [f"{k} {old[k]} -> {new[k]}" for k in old if k != "name" and old[k] != new[k]]
+    entry = {
+        "frame": g["frames"],
+        "from": old["name"],
+        "to": new["name"],
+        "p90_ms": p90 * 1000.0,
+        "budget_ms": budget * 1000.0,
+        "changes": traded,
+    }
+    g["log"].append(entry)
+    if profiling():
+        print(
+            f"quality: {old['name']} -> {new['name']} at frame {entry['frame']} "
+            f"(p90 {entry['p90_ms']:.2f} ms, budget {entry['budget_ms']:.2f} ms): {', '.join(traded)}"
+        )
+    if step > 0: # this level was too slow: coming back to it waits longer every time
+        strikes = g["strikes"][g["level"]] = g["strikes"].get(g["level"], 0) + 1
+        g["up_hold"] = min(S.QUALITY_HOLD * 2 ** strikes, S.QUALITY_BACKOFF_MAX)
+    g["level"] += step
+    g["count"] = 0
+    g["hold"] = S.QUALITY_HOLD
+
+def observe_frame(busy):
+    """Report the busy time of the last frame, in seconds."""
+    g = _governor
+    if not g["enabled"]:
+        return
+    g["frames"] += 1
+    g["up_hold"] = max(g["up_hold"] - 1, 0)
+    if g["hold"] > 0:
+        g["hold"] -= 1 # frames right after a change still carry the old level's cost
+        return
+    samples = g["samples"]
+    samples[g["count"] % len(samples)] = busy
+    g["count"] += 1
+    if g["count"] < len(samples):
+        return
+
+    g["count"] = 0
+    budget = 1.0 / S.TARGET_FPS
+    p90 = np.percentile(samples, 90)
+    if p90 > budget * S.QUALITY_DOWN_AT and g["level"] < len(S.QUALITY_LEVELS) - 1:
+        _change(1, p90, budget)
+    elif p90 < budget * S.QUALITY_UP_AT and g["level"] > 0 and not g["up_hold"]:
+        _change(-1, p90, budget)
@@ -1,23 +1,27 @@
+import numpy as np
 import pygame as pg
 
 import settings as S
 from helpers import add_alpha
-from atlas import get_frame_with_alpha
+from assets import get_atlas, render_target
+from atlas import get_alpha_frame, get_scaled_frame
+from ecs import is_alive, slot_of, tag_mask, view
+from profiler import draw_overlay, profiled
+from quality import quality
+from text import cached_text
+from trails import active_tile_rects, clear_trail_layer, fade_trails, resize_trail_layer, stamp_trails
 import texture_settings
 
-overlay = pg.Surface((S.SCREEN_W, S.SCREEN_W), pg.SRCALPHA)
-overlay.fill(add_alpha(S.COLOUR_BACKGROUND, 1))
-
 def outlined_circle(
     surface,
     color,
     pos,
     radius,
     alpha=255,
-    outline_color=S.COLOUR_CIRCLE_OUTLINE,
+    outline_color=None,
     outline_width=2,
 ):
-    pg.draw.circle(surface, outline_color, pos, radius + outline_width)
+    pg.draw.circle(surface, outline_color or S.COLOUR_CIRCLE_OUTLINE, pos, radius + outline_width)
 
     pg.draw.circle(
         surface,
@@ -26,54 +30,205 @@ def outlined_circle(
         radius,
 )
 
-def render_masks(screen, reg, state):
-    animation_phase = (state["frame"] * S.ANIMATION_FPS) // (S.TARGET_FPS)
+# ------------------ circle sprite cache ------------------
+# Circles come in a handful of radii and palette colours, so each (radius, colour,
+# outline, alpha) combination is rasterized once and drawing becomes one Surface.blits.
+# The cache belongs to a palette: init_game builds a fresh one with every new palette.
+
+def make_sprite_cache(palette):
+    return {
+        "palette": palette,
+        "sprites": {}, # (radius, alpha, outline_width) -> [Surface per palette index]
+    }
+
+def _circle_sprite(color, radius, alpha, outline_width):
+    extent = radius + outline_width
+    sprite = pg.Surface((2 * extent + 1, 2 * extent + 1), pg.SRCALPHA)
+    if outline_width:
+        outlined_circle(sprite, color, (extent, extent), radius, alpha, outline_width=outline_width)
+    else:
+        pg.draw.circle(sprite, add_alpha(color, alpha), (extent, extent), radius)
+    return sprite.convert_alpha()
+
+def circle_sprites(cache, radius, alpha=255, outline_width=2):
+    key = (radius, alpha, outline_width)
+    sprites = cache["sprites"].get(key)
+    if sprites is None:
+        sprites = [_circle_sprite(c, radius, alpha, outline_width) for c in cache["palette"]]
+        cache["sprites"][key] = sprites
+    return sprites
+
+def circle_blits(cache, positions, sizes, colours, alpha=255, outline_width=2):
+    """(sprite, topleft) pairs for Surface.blits; positions (n, 2), sizes and colours (n,)."""
+    centres = positions.astype(int)
+    radii = sizes.astype(int)
+    seq = []
+    for radius in np.unique(radii).tolist():
+        group = radii == radius
+        sprites = circle_sprites(cache, radius, alpha, outline_width)
+        extent = radius + outline_width
+        seq += zip(
+            [sprites[c] for c in colours[group].tolist()],
+            (centres[group] - extent).tolist(),
+        )
+    return seq
+
+def interpolated_positions(reg, state):
+    """Live position column, blended between the last two sim steps by render_alpha."""
+    pos = view(reg, "position")
+    prev = state["prev_position"]
+    if prev is None or len(prev) != len(pos):
+        return pos
+    return prev + (pos - prev) * state["render_alpha"]
+
+def render_masks(screen, reg, state, positions, q, scale=1.0):
+    animation_phase = (state["render_frame"] * q["animation_fps"]) // (S.TARGET_FPS)
+    rects = []
     for mask in reg["tag"]["mask"]:
-        frame = get_frame_with_alpha(state["game_atlases"][reg["component"]["texture_name"][mask]]["frames"],
+        frame = get_scaled_frame(get_atlas(reg["component"]["texture_name"][mask]),
             animation_phase,
-            texture_settings.game[reg["component"]["texture_name"][mask]]["alpha"])
+            texture_settings.game[reg["component"]["texture_name"][mask]]["alpha"],
+            scale)
         
-        screen.blit(frame, (reg["component"]["position"][state["player_eid"]]) - reg["component"]["offset"][mask])
+        x, y = positions[slot_of(reg, state["player_eid"])].tolist()
+        offset = reg["component"]["offset"][mask] * scale
+        rects.append(screen.blit(frame, (x - offset.x, y - offset.y)))
+    return rects
+
+def render_circles(screen, reg, state, positions, q, scale=1.0):
+    """Blit bullet and player bodies; returns (trail blits for this frame, body rects)."""
+    cache = state["sprite_cache"]
+    bodies, trails = [], []
+    size, colour = view(reg, "size"), view(reg, "colour")
+    if scale != 1.0:
+        size = size * scale
+    outline = max(1, round(2 * scale)) if q["outlines"] else 0
+    stamp = state["render_frame"] % q["trail_every"] == 0
 
-def render(screen, reg, state, font):
-    screen.fill(S.COLOUR_BACKGROUND)
-    screen.blit(state["cumulative_static_surface"], (0, 0))
     # bullets
     if state["game_state"] != "pause":
-        for e in reg["tag"]["bullet"]:
-            if e in reg["component"]["position"] and e in reg["component"]["size"]:
-                pos = reg["component"]["position"][e]
-                rad = int(reg["component"]["size"][e])
-                outlined_circle(screen, state["color_pallete"][reg["component"]["colour"][e]], (int(pos.x), int(pos.y)), rad)
-                if state["game_state"] == "active":
-                    pg.draw.circle(state["new_tick_static_surface"],
-                        add_alpha(state["color_pallete"][reg["component"]["colour"][e]], S.TRAIL_ALPHA_BULLET),
-                        (int(pos.x), int(pos.y)),
-                        rad)
+        bullets = tag_mask(reg, "bullet")
+        bodies += circle_blits(cache, positions[bullets], size[bullets], colour[bullets], outline_width=outline)
+        if state["game_state"] == "active" and stamp:
+            trails += circle_blits(cache, positions[bullets], size[bullets], colour[bullets],
+                alpha=S.TRAIL_ALPHA_BULLET, outline_width=0)
 
     # player
     p = state.get("player_eid")
-    if p is not None and p in reg["component"]["position"] and p in reg["component"]["size"] and state["game_state"] == "active":
-        pos = reg["component"]["position"][p]
-        rad = int(reg["component"]["size"][p])
-        outlined_circle(screen, state["color_pallete"][reg["component"]["colour"][p]], (int(pos.x), int(pos.y)), rad)
-        if reg["component"]["velocity"][p]:
-            pg.draw.circle(state["new_tick_static_surface"],
-                add_alpha(state["color_pallete"][reg["component"]["colour"][p]], S.TRAIL_ALPHA_PLAYER),
-                (int(pos.x), int(pos.y)),
-                rad)
-    
-    render_masks(screen, reg, state)
-    
+    if is_alive(reg, p) and state["game_state"] == "active":
+        s = slice(slot_of(reg, p), slot_of(reg, p) + 1)
+        bodies += circle_blits(cache, positions[s], size[s], colour[s], outline_width=outline)
+        if stamp and view(reg, "velocity")[s].any():
+            trails += circle_blits(cache, positions[s], size[s], colour[s],
+                alpha=S.TRAIL_ALPHA_PLAYER, outline_width=0)
 
-    state["cumulative_static_surface"].blit(state["new_tick_static_surface"], (0, 0))
-    if(state["frame"]%S.FRAMES_PER_DARKENING == 0) and state["game_state"] != "pause":
-        state["cumulative_static_surface"].blit(overlay, (0, 0))
-    state["new_tick_static_surface"].fill((0, 0, 0, 0))
-    
+    return trails, screen.blits(bodies)
+
+def render_trails(state, trails, q):
+    """Stamp and fade the trail layer; returns the screen rects of the tiles that changed."""
+    layer = state["trail"]
+    stamp_trails(layer, trails)
+    if state["game_state"] == "pause":
+        return []
+    changed = active_tile_rects(layer)
+    fade_trails(layer, state["render_frame"], q["darkening"])
+    return changed
+
+def render_hud(screen, state, font):
+    rects = []
     if state["game_state"] == "active":
-        txt = font.render(f"Hits: {state['hits']}, Mana: {state['mana']}", True, (0, 255, 0))
-        screen.blit(txt, (12, 10))
+        # changes only on hits: rasterized then, a single cached blit otherwise
+        hud = cached_text("hud", font, f"Hits: {state['hits']}, Mana: {state['mana']}", (0, 255, 0))
+        rects.append(screen.blit(hud, (12, 10)))
     
     if state["game_state"] == "death":
-        screen.blit(get_frame_with_alpha(state["game_atlases"]["screen_death"]["frames"], 0, 255), (0, 0))
+        rects.append(screen.blit(get_alpha_frame(get_atlas("screen_death"), 0, 255), (0, 0)))
+    return rects
+
+# ------------------ dirty rectangles ------------------
+# With S.DIRTY_RECTS the screen is not rebuilt every frame: only the areas drawn last
+# frame (sprites, masks, HUD, overlay) and the trail tiles that changed are restored from
+# the trail layer, everything is drawn again on top, and render returns those rects for
+# pg.display.update. Sprites are always redrawn, so overlaps are never lost. When the
+# areas to restore add up to more than DIRTY_RECTS_MAX_AREA of the screen, a plain full
+# redraw and flip is cheaper.
+
+def make_dirty_tracker():
+    return {
+        "drawn": [],        # screen rects drawn over the background last frame
+        "trail": [],        # trail tiles stamped or faded last frame
+        "game_state": None, # a change of game state redraws everything
+        "scale": None,      # ... as does a change of render scale
+    }
+
+def _needs_full_redraw(dirty, state, scale):
+    if (
+        not S.DIRTY_RECTS
+        or scale != 1.0 # the upscale rewrites the whole screen anyway
+        or scale != dirty["scale"]
+        or state["game_state"] == "death" # the death screen covers everything
+        or state["game_state"] != dirty["game_state"]
+    ):
+        return True
+    area = sum(r.w * r.h for r in dirty["drawn"]) + sum(r.w * r.h for r in dirty["trail"])
+    return area > S.DIRTY_RECTS_MAX_AREA * S.SCREEN_W * S.SCREEN_H
+
+# ------------------ render scale ------------------
+# World layers (trails, bodies, masks) are drawn into a render target of RENDER_SCALE
+# times the window size, times the quality level's render_scale, and upscaled onto the
+# screen in one pass; the HUD and overlays are drawn after that, at window resolution.
+# At scale 1 the world is drawn straight onto the screen.
+
+def _present(world, screen):
+    scale = pg.transform.smoothscale if S.RENDER_SMOOTH else pg.transform.scale
+    scale(world, screen.get_size(), screen)
+
+def render(screen, reg, state, font, overlays=()):
+    """
+    Draw the frame. overlays: extra draw(screen) -> rect callables, drawn last at window
+    resolution. Returns the screen rects that changed, or None for the whole screen.
+    """
+    dirty = state["dirty"]
+    q = quality()
+    scale = S.RENDER_SCALE * q["render_scale"]
+    full = _needs_full_redraw(dirty, state, scale)
+    if not full and state["game_state"] == "pause":
+        return [] # nothing moves, fades or animates while paused
+
+    world = screen
+    if scale != 1.0:
+        w, h = screen.get_size()
+        world = render_target((max(1, round(w * scale)), max(1, round(h * scale))))
+
+    # the trail layer is opaque and as large as the world, so it doubles as the background clear
+    layer = state["trail"]
+    if layer["stale"]:
+        clear_trail_layer(layer)
+    if layer["surface"].get_size() != world.get_size():
+        resize_trail_layer(layer, world.get_size())
+    background = layer["surface"]
+    if full:
+        restored = None
+        profiled("render.background", world.blit, background, (0, 0))
+    else:
+        restored = dirty["drawn"] + dirty["trail"]
+        profiled("render.background", world.blits, [(background, r, r) for r in restored], False)
+    positions = interpolated_positions(reg, state)
+    if scale != 1.0:
+        positions = positions * scale
+
+    trails, drawn = profiled("render.circles", render_circles, world, reg, state, positions, q, scale)
+    drawn += profiled("render.masks", render_masks, world, reg, state, positions, q, scale)
+    dirty["trail"] = profiled("render.trails", render_trails, state, trails, q)
+    if world is not screen:
+        profiled("render.upscale", _present, world, screen)
+    drawn += profiled("render.hud", render_hud, screen, state, font)
+    overlay = draw_overlay(screen, font)
+    if overlay:
+        drawn.append(overlay)
+    drawn += [draw(screen) for draw in overlays]
+
+    dirty["drawn"] = drawn
+    dirty["game_state"] = state["game_state"]
+    dirty["scale"] = scale
+    return None if full else restored + drawn
@@ -0,0 +1,242 @@
+# rewind.py
+# Rolling history of the last REWIND_SECONDS of simulation, for scrubbing and rewinding.
+#
+# A full capture (snapshot.capture) is ~70 KB at 1000 bullets, too much to keep per step.
+# Instead every REWIND_KEYFRAME_EVERY steps a keyframe holds a full capture, and the steps
+# in between hold only what changed since the step before:
+#   - arrays (columns, dense ids, sparse/generation): the new length plus the rows that
+#     differ, so a spawn or destroy costs only the appended or swapped slots; an array in
+#     which most rows changed (positions of moving bullets) is stored whole;
+#   - cold components: per component, the entities added or changed and the ones removed;
+#   - meta parts (allocator, rngs, pending commands, state keys): only the parts that differ.
+# Going to frame f restores the last keyframe at or before f and applies the deltas after
+# it. History is capped in steps and in bytes; whole keyframe groups are dropped, oldest first.
+#
+#   python rewind.py --counts 100 1000   # per-step record cost and memory
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+import settings as S
+from snapshot import apply_capture, capture
+
+_clock = time.perf_counter
+_COMPONENT_ENTRY_BYTES = 64 # rough size of one stored dict entry, for the memory cap
+
+def make_rewind(seconds=None, keyframe_every=None, max_bytes=None):
+    seconds = seconds or S.REWIND_SECONDS
+    return {
+        "entries": [],      # one per recorded step, oldest first, consecutive frames
+        "bytes": 0,         # estimated size of all entries
+        "last_key": None,   # frame of the newest keyframe
+        "prev": None,       # (frame, arrays, components, meta) of the newest entry, materialized
+        "max_frames": int(seconds * S.SIM_HZ),
+        "keyframe_every": keyframe_every or S.REWIND_KEYFRAME_EVERY,
+        "max_bytes": max_bytes or S.REWIND_MAX_BYTES,
+        "record_time": 0.0, # seconds spent in record_step ...
+        "records": 0,       # ... over this many calls
+    }
+
+def clear_rewind(rw):
+    rw["entries"].clear()
+    rw["bytes"] = 0
+    rw["last_key"] = None
+    rw["prev"] = None
+
+# ------------------ deltas ------------------
+
+def _diff_array(cur, prev):
+    """Delta turning prev into cur, or None when they are equal."""
+    if prev is None or cur.shape[1:] != prev.shape[1:]:
+        return ("full", cur)
+    common = min(len(cur), len(prev))
+    changed = cur[:common] != prev[:common]
+    if changed.ndim > 1:
+        changed = changed.any(axis=1)
+    changed = np.flatnonzero(changed)
+    if len(cur) == len(prev) and not len(changed):
+        return None
+    if 2 * len(changed) > common:
+        return ("full", cur)
+    return ("rows", len(cur), changed.astype(np.int32), cur[changed], cur[common:].copy())
+
+def _apply_array(prev, delta):
+    if delta[0] == "full":
+        return delta[1]
+    _, length, idx, rows, tail = delta
+    out = np.empty((length,) + prev.shape[1:], dtype=prev.dtype)
+    common = length - len(tail)
+    out[:common] = prev[:common]
+    out[idx] = rows
+    out[common:] = tail
+    return out
+
+def _delta_bytes(delta):
+    return sum(a.nbytes for a in delta[1:] if isinstance(a, np.ndarray))
+
+def _diff_component(cur, prev):
+    """(changed, removed) turning prev into cur, or None when they are equal."""
+    if cur == prev:
+        return None
+    changed = {e: v for e, v in cur.items() if e not in prev or prev[e] != v}
+    removed = [e for e in prev if e not in cur]
+    return changed, removed
+
+def _materialize(entries, i):
+    """(arrays, components, meta) at entries[i]: its keyframe plus every delta up to it."""
+    k = i
+    while not entries[k]["key"]:
+        k -= 1
+    arrays, components, meta = {}, {}, {}
+    for entry in entries[k:i + 1]:
+        for name, delta in entry["arrays"].items():
+            arrays[name] = _apply_array(arrays.get(name), delta)
+        for name, (changed, removed) in entry["components"].items():
+            comp = components[name] = dict(components.get(name, ()))
+            comp.update(changed)
+            for e in removed:
+                del comp[e]
+        meta.update(entry["meta"])
+    return arrays, components, meta
+
+# ------------------ recording ------------------
+
+def _truncate(rw, frame):
+    """Forget entries at or after frame: after a rewind, that future no longer happens."""
+    entries = rw["entries"]
+    while entries and entries[-1]["frame"] >= frame:
+        rw["bytes"] -= entries.pop()["bytes"]
+    if not entries:
+        clear_rewind(rw)
+        return
+    keys = [e["frame"] for e in entries[-rw["keyframe_every"]:] if e["key"]]
+    rw["last_key"] = keys[-1] if keys else entries[0]["frame"]
+    if rw["prev"][0] != entries[-1]["frame"]:
+        rw["prev"] = (entries[-1]["frame"], *_materialize(entries, len(entries) - 1))
+
+def _trim(rw):
+    entries = rw["entries"]
+    while len(entries) > rw["max_frames"] or rw["bytes"] > rw["max_bytes"]:
+        # drop the oldest keyframe with its deltas; the newest group always stays
+        end = next((i for i in range(1, len(entries)) if entries[i]["key"]), None)
+        if end is None:
+            break
+        rw["bytes"] -= sum(e["bytes"] for e in entries[:end])
+        del entries[:end]
+
+def record_step(rw, reg, state):
+    """Append the state at the end of this step. Call once per simulated step."""
+    t0 = _clock()
+    frame = state["frame"]
+    entries = rw["entries"]
+    _truncate(rw, frame)
+    if entries and entries[-1]["frame"] != frame - 1: # a jump (e.g. quickload) breaks the chain
+        clear_rewind(rw)
+
+    views, meta = capture(reg, state, components=False)
+    arrays = {name: a.copy() for name, a in views.items()}
+    components = {name: dict(comp) for name, comp in reg["component"].items()}
+
+    key = not entries or frame - rw["last_key"] >= rw["keyframe_every"]
+    if key:
+        stored_arrays = {name: ("full", a) for name, a in arrays.items()}
+        stored_components = {name: (comp, []) for name, comp in components.items()}
+        stored_meta = meta
+        rw["last_key"] = frame
+    else:
+        _, prev_arrays, prev_components, prev_meta = rw["prev"]
+        stored_arrays = {}
+        for name, a in arrays.items():
+            delta = _diff_array(a, prev_arrays.get(name))
+            if delta is not None:
+                stored_arrays[name] = delta
+        stored_components = {}
+        for name, comp in components.items():
+            delta = _diff_component(comp, prev_components.get(name, {}))
+            if delta is not None:
+                stored_components[name] = delta
+        stored_meta = {part: v for part, v in meta.items() if v != prev_meta[part]}
+
+    size = sum(_delta_bytes(d) for d in stored_arrays.values())
+    size += sum(len(c) + len(r) for c, r in stored_components.values()) * _COMPONENT_ENTRY_BYTES
+    size += sum(len(json.dumps(v, separators=(",", ":"))) for v in stored_meta.values())
+    entries.append({
+        "frame": frame, "key": key, "bytes": size,
+        "arrays": stored_arrays, "components": stored_components, "meta": stored_meta,
+    })
+    rw["bytes"] += size
+    rw["prev"] = (frame, arrays, components, meta)
+    _trim(rw)
+
+    rw["record_time"] += _clock() - t0
+    rw["records"] += 1
+
+# ------------------ playback ------------------
+
+def seek(rw, reg, state, frame):
+    """
+    Restore the state recorded at the end of step frame, clamped to the history.
+    Newer entries stay until the simulation steps again, so scrubbing works both ways.
+    Returns the frame restored, or None when there is no history.
+    """
+    entries = rw["entries"]
+    if not entries:
+        return None
+    i = min(max(frame - entries[0]["frame"], 0), len(entries) - 1)
+    arrays, components, meta = _materialize(entries, i)
+    apply_capture(reg, state, arrays, {**meta, "component": {n: c.items() for n, c in components.items()}})
+    rw["prev"] = (entries[i]["frame"], arrays, components, meta)
+    return entries[i]["frame"]
+
+def rewind_steps(rw, reg, state, steps):
+    return seek(rw, reg, state, state["frame"] - steps)
+
+def rewind_stats(rw):
+    entries = rw["entries"]
+    return {
+        "frames": len(entries),
+        "seconds": len(entries) / S.SIM_HZ,
+        "keyframes": sum(e["key"] for e in entries),
+        "bytes": rw["bytes"],
+        "bytes_per_frame": rw["bytes"] / max(len(entries), 1),
+        "record_ms": rw["record_time"] / max(rw["records"], 1) * 1000.0,
+    }
+
+# ------------------ cost report ------------------
+
+def report(counts=(100, 500, 1000), frames=None, seed=0):
+    import headless
+
+    frames = frames or int(S.REWIND_SECONDS * S.SIM_HZ)
+    headless.init_headless()
+    print(f"{'bullets':>8} {'live':>7} {'record ms':>10} {'KB/frame':>9} {'history MB':>11} {'seek back ms':>13}")
+    for count in counts:
+        live = np.empty(frames)
+        with headless.override_settings(headless.HOLD_COUNT_OVERRIDES): # measure at count bullets
+            reg, state = headless.make_headless_game(seed, count)
+            rw = state["rewind"] = make_rewind()
+            headless.run_frames(reg, state, frames, live=live)
+        stats = rewind_stats(rw)
+
+        t0 = _clock()
+        seek(rw, reg, state, rw["last_key"] - 1) # worst case: the end of a full group of deltas
+        seek_ms = (_clock() - t0) * 1000.0
+        print(
+            f"{count:>8} {live.mean():>7.1f} {stats['record_ms']:>10.3f} {stats['bytes_per_frame'] / 1024:>9.1f} "
+            f"{stats['bytes'] / 2**20:>11.2f} {seek_ms:>13.3f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the rewind buffer")
+    parser.add_argument("--frames", type=int, default=None, help="steps per run (default: REWIND_SECONDS)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 500, 1000])
+    args = parser.parse_args()
+    report(args.counts, args.frames, args.seed)
+
+
+if __name__ == "__main__":
+    main()
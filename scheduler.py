@@ -0,0 +1,122 @@
+# scheduler.py
+# Declarative system scheduler for tick_game. Each system is described once:
+#
+#   {"name": ..., "fn": fn(reg, state, dt),
+#    "reads": (...), "writes": (...), # components / state values it uses
+#    "order": 0,                      # run order within a step, ascending
+#    "every": 1,                      # run on steps where state["frame"] % every == 0 ...
+#    "on": (),                        # ... or, instead, only when one of these events was raised
+#    "skip_unchanged": False}         # skip while its reads are as they were after its last run
+#
+# every is a number or the name of a setting, read at every step so that
+# override_settings can sweep it. Frequencies are tied to the step counter, so replays
+# and rewinds keep them in sync.
+#
+# Events are counters in state["events"], bumped by emit() from anywhere (systems, key
+# handling, restores). A system with "on" ignores every and runs on the first step at
+# which one of its events has been raised since it last ran: in the same step when the
+# emitter runs earlier (or outside the tick), in the next one otherwise.
+#
+# skip_unchanged needs a cheap signature for every read (see make_schedule) and a
+# system that does nothing when run twice on the same inputs. Otherwise reads and writes
+# are documentation only: the scheduler does not check them against what fn touches.
+#
+# Every run and skip is counted and timed per system; print_report() shows the table.
+
+import time
+
+import settings as S
+from profiler import profiled
+
+_clock = time.perf_counter
+
+SYSTEM_DEFAULTS = {"reads": (), "writes": (), "order": 0, "every": 1, "on": (), "skip_unchanged": False}
+
+_scheduler = {
+    "stats": {}, # system name -> {"runs", "skips", "seconds"}
+}
+
+def make_schedule(systems, signatures=None):
+    """
+    Validate and order system specs. signatures: {read name: fn(reg, state)} for the
+    reads of skip_unchanged systems; any cheap, comparable value will do.
+    """
+    signatures = signatures or {}
+    schedule, names = [], set()
+    for spec in systems:
+        system = {**SYSTEM_DEFAULTS, **spec}
+        if system["name"] in names:
+            raise ValueError(f"system {system['name']!r} registered twice")
+        names.add(system["name"])
+        if isinstance(system["on"], str):
+            system["on"] = (system["on"],)
+        if system["skip_unchanged"]:
+            missing = [r for r in system["reads"] if r not in signatures]
+            if missing:
+                raise ValueError(f"system {system['name']!r} skips unchanged reads without signature: {missing}")
+            system["signature"] = [signatures[r] for r in system["reads"]]
+        schedule.append(system)
+        _scheduler["stats"].setdefault(system["name"], {"runs": 0, "skips": 0, "seconds": 0.0})
+    schedule.sort(key=lambda s: s["order"]) # stable: equal orders keep registration order
+    return schedule
+
+def emit(state, event):
+    """Raise event: systems listening for it run at their next chance."""
+    state["events"][event] = state["events"].get(event, 0) + 1
+
+def _raised(system, state):
+    """Counts of the system's events, when any was raised since it last ran; else None."""
+    counts = tuple(state["events"].get(e, 0) for e in system["on"])
+    return counts if counts != state["systems"].get(("events", system["name"]), (0,) * len(counts)) else None
+
+def _due(system, state):
+    every = system["every"]
+    if isinstance(every, str):
+        every = getattr(S, every)
+    return state["frame"] % every == 0
+
+def _inputs(system, reg, state):
+    return [sig(reg, state) for sig in system["signature"]]
+
+def run_systems(schedule, reg, state, dt):
+    """Run every due system of one step, in order."""
+    memory = state["systems"] # name -> signature of its reads after its last run; ("events", name) -> event counts
+    stats = _scheduler["stats"]
+    for system in schedule:
+        name = system["name"]
+        stat = stats[name]
+        if system["on"]:
+            counts = _raised(system, state)
+            if counts is None:
+                continue
+            memory[("events", name)] = counts
+        elif not _due(system, state):
+            continue
+        if system["skip_unchanged"] and memory.get(name) == _inputs(system, reg, state):
+            stat["skips"] += 1
+            continue
+
+        t0 = _clock()
+        profiled(f"tick.{name}", system["fn"], reg, state, dt)
+        stat["seconds"] += _clock() - t0
+        stat["runs"] += 1
+
+        if system["skip_unchanged"]:
+            memory[name] = _inputs(system, reg, state)
+
+def system_stats():
+    return {name: dict(stat) for name, stat in _scheduler["stats"].items()}
+
+def reset_stats():
+    for stat in _scheduler["stats"].values():
+        stat.update(runs=0, skips=0, seconds=0.0)
+
+def print_report(steps=None):
+    """Per-system runs, skips and cost; with steps, the cost is also averaged per step."""
+    print(f"{'system':<20} {'runs':>8} {'skips':>8} {'total ms':>10} {'ms/run':>8}" + (f" {'ms/step':>8}" if steps else ""))
+    for name, s in _scheduler["stats"].items():
+        per_run = s["seconds"] * 1000.0 / max(s["runs"], 1)
+        line = f"{name:<20} {s['runs']:>8} {s['skips']:>8} {s['seconds'] * 1000.0:>10.2f} {per_run:>8.4f}"
+        if steps:
+            line += f" {s['seconds'] * 1000.0 / steps:>8.4f}"
+        print(line)
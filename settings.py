@@ -1,9 +1,36 @@
 # settings.py
 SCREEN_W, SCREEN_H = 900, 520
-TARGET_FPS = 120
+TARGET_FPS = 120 # render rate cap
+
+SIM_HZ = 60            # fixed simulation step rate, independent of the render rate
+MAX_CATCHUP_STEPS = 5  # per rendered frame; guards against the spiral of death
 
 ANIMATION_FPS = 4
 
+PROFILER_ENABLED = False      # per-stage timings, on-screen overlay, trace export on exit
+PROFILER_FRAMES = 600         # ring buffer length
+PROFILER_OVERLAY_EVERY = 30   # frames between overlay refreshes
+PROFILER_EXPORT = "profile_trace" # writes profile_trace.csv / .json
+SHOW_FPS = False              # FPS counter in the bottom-left corner
+
+QUICKSAVE_PATH = "quicksave.cds" # snapshot written by QUICKSAVE, read by QUICKLOAD
+
+REWIND_ENABLED = True         # keep a rolling history; hold REWIND to go back in time
+REWIND_SECONDS = 10           # history length
+REWIND_KEYFRAME_EVERY = 30    # steps between full keyframes; deltas in between
+REWIND_MAX_BYTES = 64 * 2**20 # memory cap; the oldest history goes first
+REWIND_SPEED = 2              # steps rewound per rendered frame while REWIND is held
+
+RENDER_SCALE = 1.0   # world layers (trails, bodies, masks) render at this share of the window size
+RENDER_SMOOTH = False # upscale with smoothscale instead of nearest-neighbour scale
+
+SIM_THREAD = False # run the simulation on a worker thread, see sim_thread.py
+
+DIRTY_RECTS = False         # push only changed screen areas with display.update instead of flip
+DIRTY_RECTS_MAX_AREA = 0.5 # share of the screen above which a full redraw is used instead
+
+USE_ASSET_BUNDLE = True # load atlases from the precompiled bundle, see asset_bundle.py
+
 COLOUR_BACKGROUND = (0, 0, 0)
 
 PLAYER_RADIUS = 16
@@ -23,6 +50,9 @@ BULLET_SPEED_MAX = 400.0
 
 MANA_PER_HIT = 10
 
+ECS_COMPACT_INTERVAL = 60 # frames between registry compactions
+BROADPHASE_CELL = 32 # px; keep >= 2 * the typical collider radius
+
 COLOUR_VARIETY_MIN = 4
 COLOUR_VARIETY_MAX = 10
 
@@ -33,6 +63,24 @@ TRAIL_ALPHA_PLAYER = 25
 TRAIL_ALPHA_BULLET = 10
 FRAMES_PER_DARKENING = 10
 
+QUALITY_GOVERNOR = True # trade render quality for frame time under load, see quality.py
+QUALITY_WINDOW = 60     # frames per decision
+QUALITY_DOWN_AT = 1.0   # p90 busy time above this share of the frame budget: step down
+QUALITY_UP_AT = 0.6     # ... below this share: step back up
+QUALITY_HOLD = 120      # frames after a change before the next decision
+QUALITY_BACKOFF_MAX = TARGET_FPS * 600 # frames (10 min); cap on the wait before re-entering a level that was too slow
+# best first. trail_every: stamp trails every Nth frame (paired with slower darkening,
+# so trails keep roughly their length); outlines: body outlines; animation_fps: masks;
+# render_scale: multiplies RENDER_SCALE
+QUALITY_LEVELS = (
+    {"name": "high",   "trail_every": 1, "darkening": FRAMES_PER_DARKENING,     "outlines": True,  "animation_fps": ANIMATION_FPS, "render_scale": 1.0},
+    {"name": "medium", "trail_every": 2, "darkening": FRAMES_PER_DARKENING * 2, "outlines": True,  "animation_fps": ANIMATION_FPS, "render_scale": 1.0},
+    {"name": "low",    "trail_every": 2, "darkening": FRAMES_PER_DARKENING * 2, "outlines": False, "animation_fps": ANIMATION_FPS // 2, "render_scale": 0.75},
+    {"name": "lowest", "trail_every": 4, "darkening": FRAMES_PER_DARKENING * 4, "outlines": False, "animation_fps": ANIMATION_FPS // 2, "render_scale": 0.5},
+)
+
+MASK_UPDATE_EVERY = 6 # steps between mask bookkeeping passes (expiry, following the player)
+
 BASE_BULLET_SPAWN = 2
 SPAWN_DECAY_FACTOR = 0.02
 MIN_SPAWN_COUNT = 1
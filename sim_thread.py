@@ -0,0 +1,114 @@
+# sim_thread.py
+# Optional simulation thread (settings.SIM_THREAD). The worker owns reg and state: it
+# handles the game keys, runs the fixed steps (process_commands + tick_game) on its own
+# clock and, after every pass, publishes an immutable frame: copies of the columns render
+# reads, marked read-only, plus the few state values it needs. The main thread only ever
+# renders the latest published frame, so a slow step (a mass spawn after a hit) delays
+# the next frame's content but never presentation.
+#
+# Frames are double-buffered by reference: the worker builds the next frame on the side
+# and publishes it with one assignment; a frame is never written after publication, so
+# the main thread may keep using the previous one as long as it likes. latest_frame hands
+# render a shallow copy of the frame's state carrying the render-side values (alpha,
+# frame number). The render-side objects a frame refers to (query cache, sprite cache,
+# trail layer, dirty tracker) belong to the render thread alone.
+#
+# The profiler only records on the main thread, so the worker's steps are not profiled.
+#
+# Python code still runs under the GIL, so the overlap comes from NumPy kernels, blits
+# and display.flip, which release it. Keys are read by the main thread (input_state) and
+# picked up by the worker through get_keys(); record/replay needs frame-locked steps and
+# stays single-threaded.
+
+import threading
+import time
+
+import settings as S
+from game import advance_game
+from profiler import profiled
+from state_handling import state_key_processing
+
+_clock = time.perf_counter
+
+# columns render reads
+FRAME_COLUMNS = ("position", "velocity", "size", "colour", "tags")
+
+def _frozen(a):
+    a = a.copy()
+    a.flags.writeable = False
+    return a
+
+def make_frame(reg, state, published):
+    """Read-only (reg, state) pair holding just what render needs."""
+    n = reg["count"]
+    masks = reg["tag"]["mask"]
+    comp = reg["component"]
+    frame_reg = {
+        "count": n,
+        "column": {name: _frozen(reg["column"][name][:n]) for name in FRAME_COLUMNS},
+        "dense": _frozen(reg["dense"][:n]),
+        "sparse": _frozen(reg["sparse"][:reg["next_entity"]]),
+        "generation": _frozen(reg["generation"][:reg["next_entity"]]),
+        "tag": {"mask": frozenset(masks)},
+        "component": {
+            "texture_name": {m: comp["texture_name"][m] for m in masks},
+            "offset": {m: comp["offset"][m].copy() for m in masks},
+        },
+        "version": reg["version"],
+        "views": {}, # query cache of this frame, filled by the render thread
+    }
+    frame_state = {
+        "game_state": state["game_state"],
+        "frame": state["frame"],
+        "player_eid": state["player_eid"],
+        "hits": state["hits"],
+        "mana": state["mana"],
+        "prev_position": state["prev_position"], # a fresh copy every step, never written again
+        "sim_accumulator": state["sim_accumulator"],
+        "published": published,
+        # render-side objects; only the render thread touches them
+        "sprite_cache": state["sprite_cache"],
+        "trail": state["trail"],
+        "dirty": state["dirty"],
+    }
+    return frame_reg, frame_state
+
+def _run(sim):
+    reg, state = sim["reg"], sim["state"]
+    step = 1.0 / S.SIM_HZ
+    last = _clock()
+    while not sim["stop"].is_set():
+        now = _clock()
+        profiled("state_key_processing", state_key_processing, reg, state)
+        if not state["rewinding"]:
+            advance_game(reg, state, now - last)
+        last = now
+        sim["front"] = make_frame(reg, state, _clock())
+
+        # sleep until the next step is due
+        sim["stop"].wait(max(step - state["sim_accumulator"] - (_clock() - now), 0.0))
+
+def start_sim(reg, state):
+    sim = {
+        "reg": reg,
+        "state": state,
+        "front": make_frame(reg, state, _clock()), # latest published frame
+        "stop": threading.Event(),
+    }
+    sim["thread"] = threading.Thread(target=_run, args=(sim,), name="sim", daemon=True)
+    sim["thread"].start()
+    return sim
+
+def latest_frame(sim, render_frame):
+    """The newest published frame, its state extended with render_alpha (up to now) and render_frame."""
+    frame_reg, frame_state = sim["front"]
+    elapsed = frame_state["sim_accumulator"] + (_clock() - frame_state["published"])
+    return frame_reg, {
+        **frame_state,
+        "render_alpha": min(elapsed * S.SIM_HZ, 1.0),
+        "render_frame": render_frame,
+    }
+
+def stop_sim(sim):
+    sim["stop"].set()
+    sim["thread"].join()
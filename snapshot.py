@@ -0,0 +1,154 @@
+# snapshot.py
+# Compact binary snapshot of everything the simulation depends on: the registry
+# (dense columns, id allocator, cold components), both RNGs, pending commands and the
+# simulation-relevant parts of state. Render-side state (trail layer, sprite cache,
+# broadphase grid) is not stored; restore keeps the accumulated trail surface.
+#
+# Layout: header (magic, version, meta length) | JSON meta | raw array blobs.
+# Arrays are written as raw bytes at offsets listed in the meta, so a 1000-bullet
+# snapshot is a few small memcpys plus a short JSON dump.
+
+import copy
+import json
+import struct
+
+import numpy as np
+import pygame as pg
+
+from ecs import INDEXED, TAG_BITS, make_registry, set_component
+from render import make_sprite_cache
+
+MAGIC = b"CDSS"
+VERSION = 2 # 2: count, next_entity and free moved under meta["alloc"]
+_HEADER = struct.Struct("<4sII") # magic, version, meta length
+
+# state keys restored verbatim
+STATE_KEYS = (
+    "game_state", "frame", "hits", "mana", "player_eid",
+    "mask_engagement", "pallete_size", "color_pallete", "sim_accumulator",
+)
+
+def _encode_value(v):
+    if isinstance(v, pg.Vector2):
+        return {"v2": [v.x, v.y]}
+    return v
+
+def _decode_value(v):
+    if isinstance(v, dict) and "v2" in v:
+        return pg.Vector2(v["v2"])
+    if isinstance(v, pg.Vector2):
+        return pg.Vector2(v) # kept unencoded by rewind; never share it with the live registry
+    return v
+
+def capture(reg, state, components=True):
+    """
+    The simulation state as (arrays, meta): arrays are views into reg, meta is plain
+    JSON-able data built fresh on every call. components=False leaves out the cold
+    components, for callers that track those dicts themselves.
+    """
+    n = reg["count"]
+    ids = reg["next_entity"]
+    arrays = {name: col[:n] for name, col in reg["column"].items()}
+    arrays["dense"] = reg["dense"][:n]
+    arrays["sparse"] = reg["sparse"][:ids]
+    arrays["generation"] = reg["generation"][:ids]
+
+    rng_version, rng_internal, rng_gauss = state["rng"].getstate()
+    meta = {
+        "alloc": {"count": n, "next_entity": ids, "free": [int(i) for i in reg["free"]]},
+        "rng": [rng_version, rng_internal, rng_gauss],
+        "np_rng": state["np_rng"].bit_generator.state,
+        "commands": [dict(c) for c in state["commands"]],
+        "state": json.loads(json.dumps({key: state[key] for key in STATE_KEYS})),
+    }
+    if components:
+        meta["component"] = {
+            name: [[e, _encode_value(v)] for e, v in comp.items()]
+            for name, comp in reg["component"].items()
+        }
+    return arrays, meta
+
+def apply_capture(reg, state, arrays, meta):
+    """
+    Load a capture into reg and state in place; the trail layer is kept as it is.
+    meta["component"] maps each component to (entity, value) pairs.
+    """
+    alloc = meta["alloc"]
+    n, ids = alloc["count"], alloc["next_entity"]
+    new = make_registry(max(n, 1))
+    if ids > len(new["sparse"]):
+        new["sparse"] = np.full(ids, -1, dtype=np.int32)
+        new["generation"] = np.zeros(ids, dtype=np.uint32)
+    for name in new["column"]:
+        new["column"][name][:n] = arrays[name]
+    new["dense"][:n] = arrays["dense"]
+    new["sparse"][:ids] = arrays["sparse"]
+    new["generation"][:ids] = arrays["generation"]
+    new["count"] = n
+    new["next_entity"] = ids
+    new["free"] = list(alloc["free"])
+
+    for name, items in meta["component"].items():
+        for e, v in items:
+            if name in INDEXED:
+                set_component(new, name, e, _decode_value(v))
+            else:
+                new["component"][name][e] = _decode_value(v)
+
+    tags = new["column"]["tags"][:n]
+    for tag, bit in TAG_BITS.items():
+        new["tag"][tag] = set(new["dense"][:n][(tags & bit) != 0].tolist())
+
+    reg.clear()
+    reg.update(new)
+
+    palette_before = state["color_pallete"]
+    for key, value in copy.deepcopy(meta["state"]).items(): # meta may be kept, e.g. by rewind
+        state[key] = value
+    state["color_pallete"] = tuple(tuple(c) for c in state["color_pallete"])
+    if state["color_pallete"] != palette_before:
+        state["sprite_cache"] = make_sprite_cache(state["color_pallete"])
+
+    v, internal, gauss = meta["rng"]
+    state["rng"].setstate((v, tuple(internal), gauss))
+    state["np_rng"].bit_generator.state = meta["np_rng"]
+    state["commands"][:] = [dict(c) for c in meta["commands"]]
+    state["prev_position"] = None # nothing to interpolate from until the next step
+
+def snapshot(reg, state):
+    """Serialize reg and the simulation part of state to bytes."""
+    arrays, meta = capture(reg, state)
+
+    blobs, table, offset = [], {}, 0
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        table[name] = {"dtype": a.dtype.str, "shape": a.shape, "offset": offset}
+        blobs.append(a.tobytes())
+        offset += a.nbytes
+    meta["arrays"] = table
+
+    meta_bytes = json.dumps(meta, separators=(",", ":")).encode()
+    return b"".join([_HEADER.pack(MAGIC, VERSION, len(meta_bytes)), meta_bytes, *blobs])
+
+def restore(reg, state, data):
+    """Load a snapshot into reg and state in place; the trail layer is kept as it is."""
+    magic, version, meta_len = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"snapshot: not a version {VERSION} snapshot")
+    meta = json.loads(data[_HEADER.size:_HEADER.size + meta_len])
+    base = _HEADER.size + meta_len
+
+    arrays = {}
+    for name, t in meta["arrays"].items():
+        count = int(np.prod(t["shape"]))
+        a = np.frombuffer(data, dtype=np.dtype(t["dtype"]), count=count, offset=base + t["offset"])
+        arrays[name] = a.reshape(t["shape"])
+    apply_capture(reg, state, arrays, meta)
+
+def save_snapshot(path, reg, state):
+    with open(path, "wb") as f:
+        f.write(snapshot(reg, state))
+
+def load_snapshot(path, reg, state):
+    with open(path, "rb") as f:
+        restore(reg, state, f.read())
@@ -1,23 +1,49 @@
 # state_handling.py
 
-import pygame as pg
-
 import settings as S
 import keymap as K
+from input_state import get_keys, pack_keys, read_quicksave, unpack_keys
 
 from initalisation import init_game
+from rewind import clear_rewind, rewind_steps
+from scheduler import emit
+from snapshot import restore, save_snapshot
 
 def replace_dict_contents(dst: dict, src: dict):
     dst.clear()
     dst.update(src)
 
 def reload_dict(reg: dict, state: dict):
-    reg_new, state_new = init_game()
+    # derive the new seed from the old rng, so a seeded session restarts deterministically
+    reg_new, state_new = init_game(state["rng"].getrandbits(32))
+    state_new["held_keys"] = state["held_keys"] # keys still held through the restart
     replace_dict_contents(reg, reg_new)
     replace_dict_contents(state, state_new)
 
 def state_key_processing(reg, state):
-    keys = pg.key.get_pressed()
+    keys = get_keys()
+    held = state["held_keys"]
+    state["held_keys"] = pack_keys(keys)
+    pressed = unpack_keys(state["held_keys"] & ~held) # went down since the previous call
+    if state["held_keys"] != held:
+        emit(state, "keys_changed")
+
+    state["rewinding"] = keys[K.REWIND] and state["rewind"] is not None
+    if state["rewinding"]:
+        rewind_steps(state["rewind"], reg, state, S.REWIND_SPEED)
+        emit(state, "state_loaded")
+        return
+
+    if pressed[K.QUICKSAVE]:
+        save_snapshot(S.QUICKSAVE_PATH, reg, state)
+    elif pressed[K.QUICKLOAD]:
+        data = read_quicksave(S.QUICKSAVE_PATH) # from the recording when replaying
+        if data is not None:
+            restore(reg, state, data)
+            if state["rewind"] is not None:
+                clear_rewind(state["rewind"]) # history of another timeline
+            emit(state, "state_loaded")
+            return
     
     if state["game_state"] == "pause":
         if keys[K.RESTART]:
@@ -0,0 +1,71 @@
+# text.py
+# Cached text for the HUD and debug overlays; font.render is only called when a string
+# actually changes.
+#
+#   - cached_text(slot, ...): one surface per named slot, re-rasterized only when its text
+#     or colour changes (a slot keeps just its latest string, so the cache stays small).
+#   - glyph atlas: the characters of numeric counters are rasterized once per (font,
+#     colour) into one strip; number_blits composes a value from subsurfaces of it, so a
+#     counter that changes every frame costs a few small blits and no rasterization.
+
+import pygame as pg
+
+GLYPHS = "0123456789.-+:% "
+
+_text = {
+    "slots": {},  # slot -> (font, text, colour, Surface)
+    "atlases": {}, # (font, colour) -> {char: (Surface, advance)}
+}
+
+def cached_text(slot, font, text, colour):
+    cached = _text["slots"].get(slot)
+    if cached is None or cached[:3] != (font, text, colour):
+        cached = (font, text, colour, font.render(text, True, colour))
+        _text["slots"][slot] = cached
+    return cached[3]
+
+def glyph_atlas(font, colour):
+    """{char: (Surface, advance)} for every char in GLYPHS; the surfaces share one strip."""
+    key = (font, colour)
+    glyphs = _text["atlases"].get(key)
+    if glyphs is None:
+        strip = font.render(GLYPHS, True, colour)
+        h = strip.get_height()
+        glyphs = {}
+        for i, c in enumerate(GLYPHS):
+            x0 = font.size(GLYPHS[:i])[0]
+            x1 = font.size(GLYPHS[:i + 1])[0]
+            glyphs[c] = (strip.subsurface(pg.Rect(x0, 0, x1 - x0, h)), x1 - x0)
+        _text["atlases"][key] = glyphs
+    return glyphs
+
+def number_blits(font, value, pos, colour, fmt=""):
+    """(sprite, topleft) pairs drawing format(value, fmt) from the glyph atlas, and the end x."""
+    glyphs = glyph_atlas(font, colour)
+    x, y = pos
+    seq = []
+    for c in format(value, fmt):
+        sprite, advance = glyphs[c]
+        seq.append((sprite, (x, y)))
+        x += advance
+    return seq, x
+
+def line_blits(slot, font, pos, parts, colour):
+    """
+    Blits for one line of text. parts: strings (drawn as cached labels), numbers or
+    (number, format spec) pairs (drawn from the glyph atlas).
+    Returns (blits, rect covering the line).
+    """
+    x, y = pos
+    seq = []
+    for i, part in enumerate(parts):
+        if isinstance(part, str):
+            sprite = cached_text((slot, i), font, part, colour)
+            seq.append((sprite, (x, y)))
+            x += sprite.get_width()
+            continue
+        value, fmt = part if isinstance(part, tuple) else (part, "")
+        digits, x = number_blits(font, value, (x, y), colour, fmt)
+        seq += digits
+    h = max((sprite.get_height() for sprite, _ in seq), default=0)
+    return seq, pg.Rect(pos[0], y, x - pos[0], h)
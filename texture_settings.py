@@ -5,6 +5,7 @@ from pathlib import Path
 import settings as S
 
 texture_folder = Path("assets") / "images"
+bundle_path = Path("assets") / "atlases.bundle" # built from texture_folder by asset_bundle.py
 
 # offset is math coordinate standard Up, Right = +
 game = {
@@ -0,0 +1,87 @@
+# trails.py
+# Trail layer: an opaque, screen-sized surface that trail sprites are stamped onto
+# and that fades back to COLOUR_BACKGROUND in place.
+#
+# Fading works on the pixel array (pygame.surfarray) instead of blitting a full-screen
+# overlay: every pixel steps one level toward the background once per
+# FRAMES_PER_DARKENING frames, but the work is spread over those frames (each frame
+# decays every Nth column), and only tiles that have been stamped since they last
+# went blank are touched.
+
+import numpy as np
+import pygame as pg
+
+import settings as S
+
+TILE = 64 # px
+
+def make_trail_layer(size=None):
+    size = size or (S.SCREEN_W, S.SCREEN_H)
+    surface = pg.Surface(size).convert()
+    surface.fill(S.COLOUR_BACKGROUND)
+    w, h = size
+    return {
+        "surface": surface,
+        "active": np.zeros((-(-w // TILE), -(-h // TILE)), dtype=bool), # tiles holding trail pixels
+        "background": np.array(S.COLOUR_BACKGROUND[:3], dtype=np.int16),
+        "stale": False, # set for a new game; render clears the layer before drawing on it
+    }
+
+def clear_trail_layer(layer):
+    layer["surface"].fill(S.COLOUR_BACKGROUND)
+    layer["active"][...] = False
+    layer["stale"] = False
+
+def resize_trail_layer(layer, size):
+    """Resample the layer to size in place, e.g. when the render scale changes."""
+    layer["surface"] = pg.transform.scale(layer["surface"], size)
+    w, h = size
+    layer["active"] = np.ones((-(-w // TILE), -(-h // TILE)), dtype=bool) # blank tiles retire on their own
+
+def active_tile_rects(layer):
+    """Screen rects covering the active tiles, one per vertical run of tiles."""
+    rects = []
+    for tx, ty in np.argwhere(layer["active"]).tolist(): # column by column, top to bottom
+        last = rects[-1] if rects else None
+        if last and last.x == tx * TILE and last.bottom == ty * TILE:
+            last.h += TILE
+        else:
+            rects.append(pg.Rect(tx * TILE, ty * TILE, TILE, TILE))
+    return rects
+
+def stamp_trails(layer, blits):
+    """Blit (sprite, topleft) pairs onto the layer and mark the tiles they touch."""
+    if not blits:
+        return
+    layer["surface"].blits(blits, doreturn=False)
+
+    active = layer["active"]
+    limit = np.array(active.shape) - 1
+    topleft = np.array([dest for _, dest in blits])
+    bottomright = topleft + np.array([sprite.get_size() for sprite, _ in blits]) - 1
+    x0, y0 = np.clip(topleft // TILE, 0, limit).T
+    x1, y1 = np.clip(bottomright // TILE, 0, limit).T
+    # sprites are smaller than a tile, so their corners cover every tile they touch
+    active[x0, y0] = active[x1, y0] = active[x0, y1] = active[x1, y1] = True
+
+def fade_trails(layer, frame, period=None):
+    """Decay this frame's share of the active tiles one level toward the background."""
+    period = period or S.FRAMES_PER_DARKENING
+    phase = frame % period
+    active = layer["active"]
+    if not active.any():
+        return
+
+    bg = layer["background"]
+    pixels = pg.surfarray.pixels3d(layer["surface"]) # (x, y, rgb) view, locks the surface
+    for tx, ty in np.argwhere(active).tolist():
+        x0, y0 = tx * TILE, ty * TILE
+        tile = pixels[x0 + phase:x0 + TILE:period, y0:y0 + TILE]
+        t = tile.astype(np.int16)
+        t += np.sign(bg - t)
+        tile[...] = t
+
+        # after the last phase every column of the tile has decayed once: retire blank tiles
+        if phase == period - 1 and (pixels[x0:x0 + TILE, y0:y0 + TILE] == bg).all():
+            active[tx, ty] = False
+    del pixels